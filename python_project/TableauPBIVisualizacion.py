@@ -1,8 +1,9 @@
-import xml.etree.ElementTree as ET
 import json
 import os
 import random
-import re
+
+from extractors import parse_workbook, as_workbook_model
+from extractors import extract_datasource_and_dependencies as _extract_datasource_and_dependencies
 
 """
     Genera un string aleatorio de 20 caracteres hexadecimales.
@@ -35,74 +36,8 @@ def get_visual_generator_by_type(worksheet_type):
 
 def extract_datasource_and_dependencies(twb_file_path):
     
-    try:
-        tree = ET.parse(twb_file_path)
-        root = tree.getroot()
-    except ET.ParseError as e:
-        print(f"Error al procesar el archivo XML: {e}")
-        return []
-
-    extracted_data_dependencies = []
-
-    for worksheet in root.findall(".//worksheet"):
-        run_tag = worksheet.find(".//run")
-        worksheet_title = run_tag.text if run_tag is not None else ""
-        cols_tag = worksheet.find(".//cols")
-        rows_tag = worksheet.find(".//rows")
-        cols_value = cols_tag.text if cols_tag is not None and cols_tag.text is not None else ""
-        rows_value = rows_tag.text if rows_tag is not None and rows_tag.text is not None else ""
-        cols_result = re.findall(r":(.*?):", cols_value)
-        rows_result = re.findall(r":(.*?):", rows_value)
-        worksheet_info = {
-            "worksheet_name": worksheet.get("name", ""),
-            "worksheet_title": worksheet_title,
-            "type": worksheet.find(".//mark").get("class", ""),
-            "worksheet_datasources": [],
-            "dependency_info": [],
-            "cols": cols_result,
-            "rows": rows_result
-        }
-        for datasources in worksheet.findall(".//datasources"):
-            for datasource in datasources.findall(".//datasource"):
-                datasource_info = {
-                    "caption": datasource.get("caption", ""),
-                    "name": datasource.get("name", "")
-                }
-                datasource_name = datasource.get("name", "")
-                relation_name = None
-                for relation in root.findall(f".//datasource[@name='{datasource_name}']//relation//relation"):
-                    relation_name = relation.get("name", "")
-                    break
-                datasource_info["relation_name"] = relation_name
-                worksheet_info["worksheet_datasources"].append(datasource_info)
-        for dependencies in worksheet.findall(".//datasource-dependencies"):
-            dependency_info = {
-                "datasource": dependencies.get("datasource", ""),
-                "columns": [],
-                "column_instances": []
-            }
-            for column in dependencies.findall(".//column"):
-                column_info = {
-                    "caption": column.get("caption", ""),
-                    "name": column.get("name", ""),
-                    "role": column.get("role", ""),
-                    "calculation_formula": column.find("calculation").get("formula", "") if column.find("calculation") is not None else ""
-                }
-                dependency_info["columns"].append(column_info)
-            for column_instance in dependencies.findall(".//column-instance"):
-                column_instance_info = {
-                    "column": column_instance.get("column", ""),
-                    "derivation": column_instance.get("derivation", "")
-                }
-                dependency_info["column_instances"].append(column_instance_info)
-            worksheet_info["dependency_info"].append(dependency_info)
-        extracted_data_dependencies.append({
-            "worksheet": worksheet_info
-        })
-    with open("extracted_data_dependencies.json", "w", encoding="utf-8") as f:
-        json.dump(extracted_data_dependencies, f, ensure_ascii=False, indent=2)
-        print("Archivo JSON generado con los datos extraídos.")
-    return extracted_data_dependencies
+    # Reutiliza el modelo compartido de extractors.py (un único parseo del XML)
+    return _extract_datasource_and_dependencies(twb_file_path)
 
 #Función para gráfico de columnas
 def generate_json_column_graph(extracted_data, name):
@@ -716,26 +651,14 @@ def generate_json_table(extracted_data, name):
 """
 def extract_dashboards_and_worksheets(twb_file_path):
     
-    try:
-        tree = ET.parse(twb_file_path)
-        root = tree.getroot()
-    except ET.ParseError as e:
-        print(f"Error al procesar el archivo XML: {e}")
-        return []
-    dashboards = []
-    for dashboard in root.findall(".//dashboard"):
-        dashboard_name = dashboard.get("name", "")
-        worksheet_names = []
-        for zone in dashboard.findall(".//zone"):
-            ws_name = zone.get("name")
-            if ws_name:
-                worksheet_names.append(ws_name)
-        worksheet_names = list(dict.fromkeys(worksheet_names))
-        dashboards.append({
-            "dashboard_name": dashboard_name,
-            "worksheet_names": worksheet_names
-        })
-    return dashboards
+    model = as_workbook_model(twb_file_path)
+    return [
+        {
+            "dashboard_name": dashboard["dashboard_name"],
+            "worksheet_names": dashboard["worksheet_names"]
+        }
+        for dashboard in model.dashboards
+    ]
 
 """
     Normaliza un nombre de worksheet o dashboard para comparación (minúsculas y sin espacios extra).
@@ -749,9 +672,10 @@ if __name__ == "__main__":
     # Ruta al archivo Tableau
     twb_path = r"C:\Users\alejo\OneDrive\Desktop\tableau_to_powerbi\python_project\TableauPrueba.twb"
     
-    # Extraer dashboards y worksheets
-    dashboards = extract_dashboards_and_worksheets(twb_path)
-    extracted_data = extract_datasource_and_dependencies(twb_path)
+    # Parsear el workbook una sola vez y extraer dashboards y worksheets
+    workbook = parse_workbook(twb_path)
+    dashboards = extract_dashboards_and_worksheets(workbook)
+    extracted_data = extract_datasource_and_dependencies(workbook)
     dashboard_hex_list = []
 
     # Procesar cada dashboard y generar carpetas y archivos de página y visuals
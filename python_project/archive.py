@@ -0,0 +1,89 @@
+import io
+import os
+import sys
+import zipfile
+import argparse
+
+"""
+Salida del reporte como un único archivo zip en lugar de miles de archivos sueltos.
+write_archive arma el zip en memoria y lo escribe en disco de una sola vez (útil en unidades
+de red o sincronizadas, donde el costo por archivo domina). explode_archive hace el camino
+inverso para los consumidores que necesitan la estructura de carpetas.
+
+Uso como comando:
+    python archive.py explode REPORTE.zip CARPETA_DESTINO
+"""
+
+# Carpeta raíz de los miembros del zip (equivale a <nombre>.Report/definition)
+ARCHIVE_ROOT = "definition"
+
+# Fecha fija para que el mismo contenido produzca siempre el mismo zip
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def write_archive(archive_path, members, compression=zipfile.ZIP_DEFLATED):
+    """
+    Escribe members ({nombre: bytes}, o None para una carpeta) en archive_path.
+    Los miembros se ordenan por nombre y llevan fecha fija, así el zip es reproducible.
+    El archivo se reemplaza de forma atómica. Devuelve el tamaño del zip en bytes.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as package:
+        for name in sorted(members):
+            info = zipfile.ZipInfo(name, date_time=_ZIP_DATE_TIME)
+            payload = members[name]
+            if payload is None:
+                info.external_attr = (0o40755 << 16) | 0x10
+                package.writestr(info, b"")
+            else:
+                info.compress_type = compression
+                info.external_attr = 0o644 << 16
+                package.writestr(info, payload)
+
+    folder = os.path.dirname(archive_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer.getbuffer())
+    os.replace(tmp_path, archive_path)
+    return buffer.getbuffer().nbytes
+
+
+def explode_archive(archive_path, dest_folder):
+    """
+    Extrae un reporte generado con write_archive en dest_folder
+    (queda dest_folder/definition/pages/...). Devuelve la cantidad de archivos extraídos.
+    """
+    dest_root = os.path.abspath(dest_folder)
+    extracted = 0
+    with zipfile.ZipFile(archive_path) as package:
+        for info in package.infolist():
+            target = os.path.abspath(os.path.join(dest_root, info.filename))
+            # Evita rutas que escapen de la carpeta destino
+            if os.path.commonpath([dest_root, target]) != dest_root:
+                raise ValueError(f"Ruta inválida en el archivo: {info.filename}")
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with package.open(info) as src, open(target, "wb") as dst:
+                dst.write(src.read())
+            extracted += 1
+    return extracted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Herramientas para reportes Power BI empaquetados en zip.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    explode = subparsers.add_parser("explode", help="Extrae el zip a la estructura de carpetas")
+    explode.add_argument("archive")
+    explode.add_argument("dest")
+    args = parser.parse_args(argv)
+    count = explode_archive(args.archive, args.dest)
+    print(f"{count} archivos extraídos en {args.dest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
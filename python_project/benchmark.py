@@ -0,0 +1,220 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+import xml_backend
+from synthetic import write_workbook
+from records import to_plain
+from extractors import (
+    WorkbookModel, parse_workbook, extract_datasource_and_dependencies, extract_dashboards_and_worksheets
+)
+from generators import (
+    generate_json_column_graph, generate_json_bar_graph, generate_json_line_graph,
+    generate_json_pie, generate_json_table
+)
+from main import convert_workbook
+
+"""
+Micro-benchmarks por etapa de la conversión sobre workbooks sintéticos (ver synthetic.py)
+de tamaño creciente. Para cada tamaño se mide el mejor tiempo de varias repeticiones de:
+parseo XML, extract_datasource_and_dependencies, extract_dashboards_and_worksheets,
+cada generate_json_* (aplicado a todos los worksheets) y la escritura del árbol en disco.
+
+La columna "escala" compara el crecimiento del tiempo con el del tamaño respecto de la fila
+anterior: ~1.0 es lineal, valores claramente mayores indican comportamiento cuadrático.
+
+Si hay más de un backend XML disponible (ver xml_backend.py), cada tamaño se mide con todos,
+se verifica que la extracción dé resultados idénticos y se informa la aceleración respecto del
+primero (etree) en las etapas que dependen del backend (BACKEND_STAGES); en las demás la
+diferencia entre backends es ruido de medición.
+
+Uso como comando:
+    python benchmark.py --sizes 10,100,1000 --repeat 3 --backends etree,lxml --json resultados.json
+"""
+
+DEFAULT_SIZES = (10, 100, 1000)
+
+# Etapas cuyo tiempo depende del backend XML: las únicas en las que se informa la aceleración
+BACKEND_STAGES = ("parse_xml", "extract_datasource_and_dependencies", "extract_dashboards_and_worksheets")
+
+GENERATORS = {
+    "generate_json_column_graph": generate_json_column_graph,
+    "generate_json_bar_graph": generate_json_bar_graph,
+    "generate_json_line_graph": generate_json_line_graph,
+    "generate_json_pie": generate_json_pie,
+    "generate_json_table": generate_json_table,
+}
+
+_POSITION = {"position_X": 0, "position_Y": 0, "position_width": 400, "position_height": 300, "position_Z": 0}
+
+
+def workbook_params(worksheets):
+    """
+    Parámetros de synthetic.generate_workbook para un tamaño dado (en worksheets).
+    """
+    return {
+        "worksheets": worksheets,
+        "dashboards": max(1, worksheets // 10),
+        "zones": min(10, worksheets),
+        "datasources": max(1, worksheets // 50),
+        "columns": 20,
+        "calculated": 5,
+    }
+
+
+def best_time(fn, repeat):
+    """
+    Ejecuta fn repeat veces (con la salida de print descartada) y devuelve el mejor tiempo en segundos.
+    """
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_size(twb_path, repeat):
+    """
+    Mide todas las etapas sobre un workbook. Devuelve {etapa: segundos}.
+    """
+    timings = {}
+    timings["parse_xml"] = best_time(lambda: _parse_file(twb_path), repeat)
+
+    root = parse_workbook(twb_path).root
+    timings["extract_datasource_and_dependencies"] = best_time(
+        lambda: extract_datasource_and_dependencies(WorkbookModel(root), save_json=False), repeat
+    )
+    timings["extract_dashboards_and_worksheets"] = best_time(
+        lambda: extract_dashboards_and_worksheets(WorkbookModel(root)), repeat
+    )
+
+    extracted_data = extract_datasource_and_dependencies(WorkbookModel(root), save_json=False)
+    for name, generate_func in GENERATORS.items():
+        timings[name] = best_time(
+            lambda: [generate_func([worksheet_data], "benchmark", **_POSITION) for worksheet_data in extracted_data],
+            repeat
+        )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        tree = convert_workbook(twb_path)
+    timings["convert_in_memory"] = best_time(lambda: convert_workbook(twb_path), repeat)
+    with tempfile.TemporaryDirectory() as folder:
+        timings["write_folder"] = best_time(lambda: tree.write_folder(os.path.join(folder, "definition")), repeat)
+    return timings
+
+
+def _parse_file(twb_path):
+    with open(twb_path, "rb") as f:
+        return xml_backend.parse(f)
+
+
+def extraction_snapshot(twb_path):
+    """
+    Resultado completo de la extracción (en dicts planos), para comparar backends.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = parse_workbook(twb_path)
+        return to_plain({
+            "dashboards": extract_dashboards_and_worksheets(model),
+            "worksheets": extract_datasource_and_dependencies(model, save_json=False),
+            "datasources": model.datasources
+        })
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=3, workdir=None, backends=None):
+    """
+    Genera un workbook sintético por tamaño y mide cada etapa con cada backend XML.
+    Devuelve una lista de {"worksheets", "params", "bytes", "timings"}; con más de un backend,
+    además "backend_timings" ({backend: timings}), "speedup" y "results_match".
+    """
+    backends = list(backends or xml_backend.available_backends()[::-1])
+    previous_backend = xml_backend.get_backend()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(dir=workdir) as folder:
+            for size in sizes:
+                params = workbook_params(size)
+                twb_path = write_workbook(os.path.join(folder, f"synthetic_{size}.twb"), **params)
+                backend_timings = {}
+                snapshots = {}
+                for backend in backends:
+                    xml_backend.set_backend(backend)
+                    backend_timings[backend] = benchmark_size(twb_path, repeat)
+                    snapshots[backend] = extraction_snapshot(twb_path)
+                result = {
+                    "worksheets": size,
+                    "params": params,
+                    "bytes": os.path.getsize(twb_path),
+                    "timings": backend_timings[backends[0]]
+                }
+                if len(backends) > 1:
+                    base = backend_timings[backends[0]]
+                    result["backend_timings"] = backend_timings
+                    result["speedup"] = {
+                        backend: {stage: base[stage] / timings[stage] if timings[stage] else None
+                                  for stage in BACKEND_STAGES}
+                        for backend, timings in backend_timings.items() if backend != backends[0]
+                    }
+                    result["results_match"] = all(snapshots[b] == snapshots[backends[0]] for b in backends)
+                results.append(result)
+    finally:
+        xml_backend.set_backend(previous_backend)
+    return results
+
+
+def format_report(results):
+    """
+    Arma la tabla de resultados: tiempo total, tiempo por worksheet y escala respecto del tamaño anterior.
+    """
+    lines = []
+    stages = list(results[0]["timings"]) if results else []
+    for stage in stages:
+        lines.append(stage)
+        previous = None
+        for result in results:
+            seconds = result["timings"][stage]
+            per_item = seconds / result["worksheets"] * 1e6
+            scale = ""
+            if previous is not None and previous["timings"][stage] > 0:
+                growth = seconds / previous["timings"][stage]
+                scale = f"escala {growth / (result['worksheets'] / previous['worksheets']):.2f}"
+            lines.append(f"  {result['worksheets']:>7} worksheets  {seconds * 1000:10.2f} ms  {per_item:10.1f} µs/ws  {scale}")
+            previous = result
+    for result in results:
+        for backend, speedups in result.get("speedup", {}).items():
+            lines.append(f"Aceleración de {backend} con {result['worksheets']} worksheets "
+                         f"(resultados {'idénticos' if result['results_match'] else 'DISTINTOS'}):")
+            for stage, speedup in speedups.items():
+                lines.append(f"  {stage:<40} x{speedup:.2f}" if speedup else f"  {stage:<40} -")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark por etapas de la conversión con workbooks sintéticos.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Cantidades de worksheets separadas por coma")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición (se toma la mejor)")
+    parser.add_argument("--backends", default=None,
+                        help="Backends XML a comparar, separados por coma (por defecto, todos los disponibles)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Guarda los resultados en un archivo JSON")
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    backends = [name.strip() for name in args.backends.split(",")] if args.backends else None
+    results = run_benchmarks(sizes, args.repeat, backends=backends)
+    print(format_report(results))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
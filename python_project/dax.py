@@ -0,0 +1,709 @@
+import re
+import threading
+from collections import OrderedDict
+
+import tracing
+from records import CalculationRecord
+from utils import normalize_field, field_index_for
+
+"""
+Traducción de campos calculados de Tableau a DAX.
+La fórmula se tokeniza, se parsea a un AST (tuplas) y se emite como expresión DAX. El resultado
+es una medida si la fórmula agrega (SUM, AVG, COUNTD...) o usa otra medida, y una columna
+calculada si es de nivel de fila.
+
+Los mismos campos calculados se repiten en muchos worksheets (y en muchos workbooks del mismo
+datasource), así que las traducciones se guardan en una TranslationCache: el AST por texto de
+fórmula normalizado y la expresión DAX por (fórmula normalizada, tabla, referencias resueltas).
+La caché por defecto (DEFAULT_CACHE) vive en el proceso, de modo que cada fórmula distinta se
+parsea y se traduce una sola vez por proceso de un batch, no una vez por visual; tiene un límite
+de entradas (CACHE_MAX_ENTRIES, se descartan las menos usadas) y es segura entre hilos.
+
+Lo que no tiene equivalente directo (expresiones LOD {FIXED ...}, funciones de tabla, etc.)
+lanza DaxTranslationError; calculations_for() lo registra en el campo "error" del resultado.
+"""
+
+
+class DaxTranslationError(ValueError):
+    """
+    La fórmula no se puede parsear o no tiene traducción a DAX.
+    """
+
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+|//[^\n]*)
+  | (?P<field>\[(?:[^\]]|\]\])*\])
+  | (?P<string>"(?:[^"]|"")*"|'(?:[^']|'')*')
+  | (?P<date>\#[^#]*\#)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op><=|>=|==|!=|<>|[-+*/%^=<>(),{}:.])
+""", re.VERBOSE)
+
+_KEYWORDS = {"IF", "THEN", "ELSEIF", "ELSE", "END", "CASE", "WHEN", "AND", "OR", "NOT",
+             "TRUE", "FALSE", "NULL", "FIXED", "INCLUDE", "EXCLUDE"}
+
+_COMPARISONS = {"=", "==", "!=", "<>", "<", ">", "<=", ">="}
+
+# Agregaciones de Tableau -> (función DAX sobre una columna, variante iteradora sobre una expresión)
+AGGREGATES = {
+    "SUM": ("SUM", "SUMX"),
+    "AVG": ("AVERAGE", "AVERAGEX"),
+    "MIN": ("MIN", "MINX"),
+    "MAX": ("MAX", "MAXX"),
+    "COUNT": ("COUNT", "COUNTX"),
+    "COUNTD": ("DISTINCTCOUNT", None),
+    "MEDIAN": ("MEDIAN", "MEDIANX"),
+    "STDEV": ("STDEV.S", "STDEVX.S"),
+    "STDEVP": ("STDEV.P", "STDEVX.P"),
+    "VAR": ("VAR.S", "VARX.S"),
+    "VARP": ("VAR.P", "VARX.P"),
+}
+
+# Funciones de nivel de fila que en DAX tienen el mismo orden de argumentos
+ROW_FUNCTIONS = {
+    "ABS": "ABS", "SQRT": "SQRT", "EXP": "EXP", "LN": "LN", "LOG": "LOG", "POWER": "POWER",
+    "SIGN": "SIGN", "INT": "INT", "DIV": "QUOTIENT", "MIN": "MIN", "MAX": "MAX",
+    "UPPER": "UPPER", "LOWER": "LOWER", "LEN": "LEN", "LEFT": "LEFT", "RIGHT": "RIGHT", "TRIM": "TRIM",
+    "REPLACE": "SUBSTITUTE", "CONTAINS": "CONTAINSSTRING", "ISNULL": "ISBLANK", "IFNULL": "COALESCE",
+    "TODAY": "TODAY", "NOW": "NOW", "YEAR": "YEAR", "MONTH": "MONTH", "DAY": "DAY",
+}
+
+# Partes de fecha de Tableau ('day', 'month'...) -> intervalo de DATEDIFF en DAX
+DATE_PARTS = {
+    "second": "SECOND", "minute": "MINUTE", "hour": "HOUR", "day": "DAY",
+    "week": "WEEK", "month": "MONTH", "quarter": "QUARTER", "year": "YEAR",
+}
+
+# Tipos de dato de Tableau -> tipo de valor que usa la traducción para decidir entre + y &
+VALUE_TYPES = {"string": "string", "integer": "number", "real": "number",
+               "date": "date", "datetime": "date", "boolean": "boolean"}
+
+# Tipo del resultado de las funciones de Tableau; las que no están (MIN, MAX, ATTR, IIF,
+# IFNULL) devuelven el tipo de sus argumentos
+_FUNCTION_TYPES = dict.fromkeys(AGGREGATES, "number")
+del _FUNCTION_TYPES["MIN"], _FUNCTION_TYPES["MAX"]
+_FUNCTION_TYPES.update(dict.fromkeys(("UPPER", "LOWER", "LEFT", "RIGHT", "TRIM", "REPLACE", "MID", "STR"), "string"))
+_FUNCTION_TYPES.update(dict.fromkeys(("ABS", "SQRT", "EXP", "LN", "LOG", "POWER", "SIGN", "INT", "DIV", "LEN", "FIND",
+                                      "ROUND", "CEILING", "FLOOR", "FLOAT", "ZN", "DATEDIFF", "YEAR", "MONTH", "DAY"),
+                                     "number"))
+_FUNCTION_TYPES.update(dict.fromkeys(("CONTAINS", "STARTSWITH", "ENDSWITH", "ISNULL"), "boolean"))
+_FUNCTION_TYPES.update(dict.fromkeys(("TODAY", "NOW"), "date"))
+
+# Máximo de entradas de cada diccionario de una TranslationCache
+CACHE_MAX_ENTRIES = 4096
+
+_BINARY_OPERATORS = {"+": "+", "-": "-", "*": "*", "^": "^", "AND": "&&", "OR": "||",
+                     "=": "=", "==": "=", "!=": "<>", "<>": "<>", "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+
+
+def tokenize(formula):
+    """
+    Divide una fórmula en tokens (tipo, texto), sin espacios ni comentarios.
+    Las palabras clave y los nombres de función se pasan a mayúsculas (en Tableau no distinguen).
+    """
+    tokens = []
+    position = 0
+    while position < len(formula):
+        match = _TOKEN.match(formula, position)
+        if match is None:
+            raise DaxTranslationError(f"Carácter inesperado en la fórmula: {formula[position]!r}")
+        kind = match.lastgroup
+        text = match.group()
+        position = match.end()
+        if kind == "space":
+            continue
+        if kind == "name":
+            text = text.upper()
+        tokens.append((kind, text))
+    return tokens
+
+
+def normalize_formula(formula):
+    """
+    Texto canónico de una fórmula (tokens separados por un espacio, sin comentarios), usado
+    como clave de caché: dos fórmulas que solo difieren en formato comparten traducción.
+    """
+    return " ".join(text for _, text in tokenize(formula))
+
+
+class _Parser:
+    """
+    Parser descendente recursivo de la sintaxis de cálculos de Tableau.
+    Nodos del AST: ("number", texto), ("string", valor), ("date", texto), ("bool", valor),
+    ("null",), ("field", nombre), ("call", FUNCIÓN, [args]), ("neg", x), ("not", x),
+    ("binary", operador, izquierda, derecha), ("if", [(condición, valor)], else),
+    ("case", expresión, [(valor, resultado)], else).
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise DaxTranslationError("Fin de fórmula inesperado")
+        self.position += 1
+        return token
+
+    def accept(self, text):
+        if self.peek()[1] == text and self.peek()[0] in ("name", "op"):
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, text):
+        if not self.accept(text):
+            raise DaxTranslationError(f"Se esperaba {text!r} y se encontró {self.peek()[1]!r}")
+
+    def parse(self):
+        node = self.expression()
+        if self.peek()[0] is not None:
+            raise DaxTranslationError(f"Token inesperado: {self.peek()[1]!r}")
+        return node
+
+    def expression(self):
+        node = self.conjunction()
+        while self.accept("OR"):
+            node = ("binary", "OR", node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.accept("AND"):
+            node = ("binary", "AND", node, self.negation())
+        return node
+
+    def negation(self):
+        if self.accept("NOT"):
+            return ("not", self.negation())
+        return self.comparison()
+
+    def comparison(self):
+        node = self.additive()
+        kind, text = self.peek()
+        if kind == "op" and text in _COMPARISONS:
+            self.position += 1
+            node = ("binary", text, node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.term()
+        while self.peek()[0] == "op" and self.peek()[1] in ("+", "-"):
+            node = ("binary", self.next()[1], node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek()[0] == "op" and self.peek()[1] in ("*", "/", "%"):
+            node = ("binary", self.next()[1], node, self.unary())
+        return node
+
+    def unary(self):
+        if self.accept("-"):
+            return ("neg", self.unary())
+        node = self.primary()
+        if self.accept("^"):
+            node = ("binary", "^", node, self.unary())
+        return node
+
+    def primary(self):
+        kind, text = self.next()
+        if kind == "number":
+            return ("number", text)
+        if kind == "string":
+            return ("string", text[1:-1].replace(text[0] * 2, text[0]))
+        if kind == "date":
+            return ("date", text[1:-1].strip())
+        if kind == "field":
+            name = text
+            # [datasource].[campo]: se conserva el campo
+            while self.peek() == ("op", ".") and self.position + 1 < len(self.tokens) \
+                    and self.tokens[self.position + 1][0] == "field":
+                self.position += 1
+                name = self.next()[1]
+            return ("field", name[1:-1].replace("]]", "]"))
+        if kind == "op" and text == "(":
+            node = self.expression()
+            self.expect(")")
+            return node
+        if kind == "op" and text == "{":
+            raise DaxTranslationError("Las expresiones LOD ({FIXED/INCLUDE/EXCLUDE ...}) no tienen traducción directa")
+        if kind == "name":
+            if text in ("TRUE", "FALSE"):
+                return ("bool", text == "TRUE")
+            if text == "NULL":
+                return ("null",)
+            if text == "IF":
+                return self.if_expression()
+            if text == "CASE":
+                return self.case_expression()
+            if text not in _KEYWORDS and self.accept("("):
+                args = []
+                if not self.accept(")"):
+                    args.append(self.expression())
+                    while self.accept(","):
+                        args.append(self.expression())
+                    self.expect(")")
+                return ("call", text, args)
+        raise DaxTranslationError(f"Token inesperado: {text!r}")
+
+    def if_expression(self):
+        branches = [(self.expression(), None)]
+        self.expect("THEN")
+        branches[0] = (branches[0][0], self.expression())
+        otherwise = None
+        while True:
+            if self.accept("ELSEIF"):
+                condition = self.expression()
+                self.expect("THEN")
+                branches.append((condition, self.expression()))
+            elif self.accept("ELSE"):
+                otherwise = self.expression()
+                self.expect("END")
+                break
+            else:
+                self.expect("END")
+                break
+        return ("if", branches, otherwise)
+
+    def case_expression(self):
+        subject = self.expression()
+        whens = []
+        otherwise = None
+        while self.accept("WHEN"):
+            value = self.expression()
+            self.expect("THEN")
+            whens.append((value, self.expression()))
+        if not whens:
+            raise DaxTranslationError("CASE sin WHEN")
+        if self.accept("ELSE"):
+            otherwise = self.expression()
+        self.expect("END")
+        return ("case", subject, whens, otherwise)
+
+
+def parse_formula(formula):
+    """
+    Parsea una fórmula de Tableau y devuelve su AST.
+    """
+    return _Parser(tokenize(formula)).parse()
+
+
+def field_references(node, found=None):
+    """
+    Nombres de los campos referenciados en un AST, en orden de aparición y sin repetir.
+    """
+    found = [] if found is None else found
+    kind = node[0]
+    if kind == "field":
+        if node[1] not in found:
+            found.append(node[1])
+        return found
+    if kind == "call":
+        children = list(node[2])
+    elif kind in ("neg", "not"):
+        children = [node[1]]
+    elif kind == "binary":
+        children = [node[2], node[3]]
+    elif kind == "if":
+        children = [part for branch in node[1] for part in branch] + [node[2]]
+    elif kind == "case":
+        children = [node[1]] + [part for when in node[2] for part in when] + [node[3]]
+    else:
+        children = []
+    for child in children:
+        if child is not None:
+            field_references(child, found)
+    return found
+
+
+def quote_table(table):
+    return "'" + table.replace("'", "''") + "'"
+
+
+def quote_name(name):
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def dax_string(value):
+    return '"' + value.replace('"', '""') + '"'
+
+
+class _Emitter:
+    """
+    Emite la expresión DAX de un AST. references: {campo normalizado: (referencia DAX, es_medida)};
+    los campos que no están se toman como columnas de la tabla. datatypes: {campo normalizado:
+    datatype de Tableau}, para distinguir la suma de la concatenación de textos.
+    """
+
+    def __init__(self, table, references, datatypes):
+        self.table = table
+        self.references = references
+        self.datatypes = datatypes
+        self.aggregated = False
+
+    def field(self, name):
+        return self.references.get(normalize_field(name), (quote_table(self.table) + quote_name(name), False))
+
+    def emit(self, node, nested=False):
+        kind = node[0]
+        if kind == "number":
+            return node[1]
+        if kind == "string":
+            return dax_string(node[1])
+        if kind == "bool":
+            return "TRUE()" if node[1] else "FALSE()"
+        if kind == "null":
+            return "BLANK()"
+        if kind == "date":
+            return self.date(node[1])
+        if kind == "field":
+            reference, is_measure = self.field(node[1])
+            self.aggregated = self.aggregated or is_measure
+            return reference
+        if kind == "neg":
+            return "-" + self.emit(node[1], nested=True)
+        if kind == "not":
+            return f"NOT({self.emit(node[1])})"
+        if kind == "binary":
+            return self.binary(node[1], node[2], node[3], nested)
+        if kind == "if":
+            return self.if_branches(node[1], node[2])
+        if kind == "case":
+            parts = [self.emit(node[1])]
+            for value, result in node[2]:
+                parts += [self.emit(value), self.emit(result)]
+            if node[3] is not None:
+                parts.append(self.emit(node[3]))
+            return f"SWITCH({', '.join(parts)})"
+        return self.call(node[1], node[2])
+
+    def value_type(self, node):
+        """
+        Tipo del valor de un nodo ("string", "number", "date", "boolean") o None si no se conoce.
+        """
+        kind = node[0]
+        if kind in ("string", "number", "date"):
+            return kind
+        if kind == "bool":
+            return "boolean"
+        if kind == "field":
+            return VALUE_TYPES.get(self.datatypes.get(normalize_field(node[1]), ""))
+        if kind == "neg":
+            return "number"
+        if kind == "not":
+            return "boolean"
+        if kind == "binary":
+            operator = node[1]
+            if operator == "+":
+                types = {self.value_type(node[2]), self.value_type(node[3])}
+                return next((value for value in ("string", "date", "number") if value in types), None)
+            return "number" if operator in ("-", "*", "/", "%", "^") else "boolean"
+        if kind == "if":
+            return self.first_type([value for _, value in node[1]] + [node[2]])
+        if kind == "case":
+            return self.first_type([result for _, result in node[2]] + [node[3]])
+        if kind == "call":
+            name, args = node[1], node[2]
+            if name in _FUNCTION_TYPES:
+                return _FUNCTION_TYPES[name]
+            return self.first_type(args[1:] if name == "IIF" else args)
+        return None
+
+    def first_type(self, nodes):
+        return next((value for value in map(self.value_type, filter(None, nodes)) if value is not None), None)
+
+    def binary(self, operator, left, right, nested):
+        if operator == "/":
+            return f"DIVIDE({self.emit(left)}, {self.emit(right)})"
+        if operator == "%":
+            return f"MOD({self.emit(left)}, {self.emit(right)})"
+        symbol = _BINARY_OPERATORS[operator]
+        if operator == "+":
+            symbol = self.plus(left, right)
+        text = f"{self.emit(left, nested=True)} {symbol} {self.emit(right, nested=True)}"
+        return f"({text})" if nested else text
+
+    def plus(self, left, right):
+        """
+        En Tableau + suma números y fechas y concatena textos (los dos operandos son del mismo
+        tipo); en DAX la concatenación es &. Basta con conocer el tipo de uno de los operandos.
+        """
+        types = {self.value_type(left), self.value_type(right)}
+        if "string" in types:
+            return "&"
+        if "number" in types or "date" in types:
+            return "+"
+        raise DaxTranslationError("No se puede saber si + suma o concatena: falta el tipo de dato de los operandos")
+
+    def if_branches(self, branches, otherwise):
+        condition, value = branches[0]
+        parts = [self.emit(condition), self.emit(value)]
+        if len(branches) > 1:
+            parts.append(self.if_branches(branches[1:], otherwise))
+        elif otherwise is not None:
+            parts.append(self.emit(otherwise))
+        return f"IF({', '.join(parts)})"
+
+    def date(self, text):
+        match = re.fullmatch(r"(\d{4})-(\d{1,2})-(\d{1,2})", text)
+        if match is None:
+            raise DaxTranslationError(f"Literal de fecha no soportado: #{text}#")
+        return "DATE({}, {}, {})".format(*(int(part) for part in match.groups()))
+
+    def call(self, name, args):
+        if name in AGGREGATES and (name not in ("MIN", "MAX") or len(args) == 1):
+            return self.aggregate(name, args)
+        if name == "ATTR" and len(args) == 1:
+            column = self.emit(args[0])
+            self.aggregated = True
+            return f"IF(HASONEVALUE({column}), VALUES({column}))"
+        if name == "IIF" and len(args) in (3, 4):
+            return f"IF({self.emit(args[0])}, {self.emit(args[1])}, {self.emit(args[2])})"
+        if name == "ZN" and len(args) == 1:
+            return f"COALESCE({self.emit(args[0])}, 0)"
+        if name == "ROUND" and len(args) in (1, 2):
+            digits = self.emit(args[1]) if len(args) == 2 else "0"
+            return f"ROUND({self.emit(args[0])}, {digits})"
+        if name in ("CEILING", "FLOOR") and len(args) == 1:
+            return f"{name}({self.emit(args[0])}, 1)"
+        if name == "MID" and len(args) in (2, 3):
+            text = self.emit(args[0])
+            length = self.emit(args[2]) if len(args) == 3 else f"LEN({text})"
+            return f"MID({text}, {self.emit(args[1])}, {length})"
+        if name == "FIND" and len(args) == 2:
+            return f"FIND({self.emit(args[1])}, {self.emit(args[0])}, 1, 0)"
+        if name in ("STARTSWITH", "ENDSWITH") and len(args) == 2:
+            text, prefix = self.emit(args[0]), self.emit(args[1])
+            side = "LEFT" if name == "STARTSWITH" else "RIGHT"
+            return f"({side}({text}, LEN({prefix})) = {prefix})"
+        if name == "STR" and len(args) == 1:
+            return f"CONVERT({self.emit(args[0])}, STRING)"
+        if name == "FLOAT" and len(args) == 1:
+            return f"CONVERT({self.emit(args[0])}, DOUBLE)"
+        if name == "DATEDIFF" and len(args) in (3, 4):
+            return f"DATEDIFF({self.emit(args[1])}, {self.emit(args[2])}, {self.date_part(args[0])})"
+        if name in ROW_FUNCTIONS:
+            return f"{ROW_FUNCTIONS[name]}({', '.join(self.emit(arg) for arg in args)})"
+        raise DaxTranslationError(f"Función sin traducción a DAX: {name}")
+
+    def aggregate(self, name, args):
+        if len(args) != 1:
+            raise DaxTranslationError(f"{name} espera un argumento")
+        column_function, iterator_function = AGGREGATES[name]
+        argument = args[0]
+        if argument[0] == "field" and not self.field(argument[1])[1]:
+            expression = self.emit(argument)
+            self.aggregated = True
+            return f"{column_function}({expression})"
+        if iterator_function is None:
+            raise DaxTranslationError(f"{name} sobre una expresión no tiene traducción directa")
+        expression = self.emit(argument)
+        self.aggregated = True
+        return f"{iterator_function}({quote_table(self.table)}, {expression})"
+
+    def date_part(self, node):
+        if node[0] != "string" or node[1].lower() not in DATE_PARTS:
+            raise DaxTranslationError("Parte de fecha no soportada en DATEDIFF")
+        return DATE_PARTS[node[1].lower()]
+
+
+def translate_ast(ast, table, references=None, datatypes=None):
+    """
+    Traduce un AST a DAX. Devuelve (expresión, tipo) con tipo "measure" o "column".
+    datatypes ({campo normalizado: datatype de Tableau}) da el tipo de los campos referenciados.
+    """
+    emitter = _Emitter(table, references or {}, datatypes or {})
+    expression = emitter.emit(ast)
+    return expression, "measure" if emitter.aggregated else "column"
+
+
+class TranslationCache:
+    """
+    Caché de traducciones: AST por fórmula normalizada y expresión DAX por
+    (fórmula normalizada, tabla, referencias resueltas, tipos de dato de los campos). Los errores
+    también se guardan, para no volver a intentar una fórmula que no se puede traducir.
+    Cada diccionario guarda como máximo max_entries elementos y descarta el usado hace más
+    tiempo (LRU), así un proceso de larga vida (server.py) no crece sin límite. El acceso está
+    protegido con un lock porque la caché se comparte entre los hilos de un mismo proceso;
+    el parseo y la traducción se hacen fuera del lock.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # texto original -> fórmula normalizada (evita volver a tokenizar)
+        self._keys = OrderedDict()
+        self._asts = OrderedDict()
+        self._translations = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, entries, key):
+        with self._lock:
+            value = entries.get(key)
+            if value is not None:
+                entries.move_to_end(key)
+            return value
+
+    def _put(self, entries, key, value):
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def parse(self, formula):
+        """
+        Devuelve (fórmula normalizada, AST o DaxTranslationError).
+        """
+        key = self._get(self._keys, formula)
+        if key is None:
+            try:
+                key = normalize_formula(formula)
+            except DaxTranslationError as e:
+                key = e
+            self._put(self._keys, formula, key)
+        if isinstance(key, DaxTranslationError):
+            return formula, key
+        ast = self._get(self._asts, key)
+        if ast is None:
+            try:
+                ast = parse_formula(formula)
+            except DaxTranslationError as e:
+                ast = e
+            self._put(self._asts, key, ast)
+        return key, ast
+
+    def translate(self, formula, table, references=None, datatypes=None):
+        """
+        Traduce una fórmula (ver translate_ast). Lanza DaxTranslationError si no se puede.
+        """
+        key, ast = self.parse(formula)
+        references = references or {}
+        datatypes = datatypes or {}
+        cache_key = (key, table, tuple(sorted(references.items())), tuple(sorted(datatypes.items())))
+        result = self._get(self._translations, cache_key)
+        if result is None:
+            with self._lock:
+                self.misses += 1
+            tracing.count("dax_translations")
+            try:
+                result = ast if isinstance(ast, DaxTranslationError) else translate_ast(ast, table, references, datatypes)
+            except DaxTranslationError as e:
+                result = e
+            self._put(self._translations, cache_key, result)
+        else:
+            with self._lock:
+                self.hits += 1
+            tracing.count("dax_cache_hits")
+        if isinstance(result, DaxTranslationError):
+            raise result
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"formulas": len(self._asts), "translations": len(self._translations),
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._asts.clear()
+            self._translations.clear()
+            self.hits = self.misses = 0
+
+
+# Caché compartida por todas las conversiones del proceso
+DEFAULT_CACHE = TranslationCache()
+
+
+def calculation_name(column):
+    """
+    Nombre de la medida o columna en Power BI: el caption del campo o, si no tiene, su nombre.
+    """
+    return column.get("caption") or column.get("name", "").strip("[]")
+
+
+def translate_calculations(columns, table, cache=None, datatypes=None, names=None):
+    """
+    Traduce los campos calculados de un bloque de columnas de un mismo datasource.
+    Devuelve {campo normalizado: CalculationRecord}. Las referencias a otros campos calculados
+    del bloque se resuelven por su nombre en Power BI ([Medida] o 'Tabla'[Columna]).
+    datatypes ({campo normalizado: datatype de Tableau}) completa el tipo de dato de los campos
+    que no están en el bloque o no lo traen; names ({campo normalizado: nombre}) reemplaza el
+    nombre en Power BI de calculation_name().
+    """
+    cache = cache or DEFAULT_CACHE
+    known = {normalize_field(column.get("name", "")): column.get("datatype", "")
+             for column in columns if column.get("datatype")}
+    datatypes = dict(datatypes or {}, **known)
+    formulas = {normalize_field(column.get("name", "")): column
+                for column in columns if column.get("calculation_formula")}
+    results = {}
+
+    def resolve(field, visiting):
+        if field in results:
+            return results[field]
+        visiting = visiting | {field}
+        column = formulas[field]
+        formula = column["calculation_formula"]
+        expression = kind = error = ""
+        try:
+            _, ast = cache.parse(formula)
+            if isinstance(ast, DaxTranslationError):
+                raise ast
+            references = {}
+            types = {}
+            for reference in field_references(ast):
+                reference_key = normalize_field(reference)
+                types[reference_key] = datatypes.get(reference_key, "")
+                if reference_key not in formulas:
+                    continue
+                if reference_key in visiting:
+                    raise DaxTranslationError(f"Referencia circular entre campos calculados: {reference}")
+                dependency = resolve(reference_key, visiting)
+                if dependency.error:
+                    raise DaxTranslationError(f"Depende de un campo sin traducción: {reference}")
+                if dependency.kind == "measure":
+                    references[reference_key] = (quote_name(dependency.name), True)
+                else:
+                    references[reference_key] = (quote_table(table) + quote_name(dependency.name), False)
+            expression, kind = cache.translate(formula, table, references, types)
+        except DaxTranslationError as e:
+            error = str(e)
+        name = (names or {}).get(field) or calculation_name(column)
+        results[field] = CalculationRecord(name=name, caption=column.get("caption", ""),
+                                           table=table, formula=formula, kind=kind, expression=expression, error=error)
+        return results[field]
+
+    for field in formulas:
+        resolve(field, frozenset())
+    return results
+
+
+def calculations_for(worksheet, cache=None, names=None):
+    """
+    Traducciones de los campos calculados de un worksheet: {campo normalizado: CalculationRecord}.
+    La tabla de cada bloque de dependencias es el caption de su datasource (la misma Entity que
+    usan los visuales). names (ver semantic_model.model_names) fija los nombres de tablas y
+    campos calculados del modelo semántico.
+    """
+    names = names or {"tables": {}, "calculations": {}}
+    captions = {datasource.get("name", ""): datasource.get("caption", "")
+                for datasource in worksheet.get("worksheet_datasources", [])}
+    datatypes = {key: field["datatype"] for key, field in field_index_for(worksheet).items() if field["datatype"]}
+    calculations = {}
+    for dependency in worksheet.get("dependency_info", []):
+        datasource = dependency.get("datasource", "")
+        table = names["tables"].get(datasource) or captions.get(datasource) or datasource
+        translations = translate_calculations(dependency.get("columns", []), table, cache, datatypes,
+                                              names["calculations"].get(datasource))
+        for field, record in translations.items():
+            calculations.setdefault(field, record)
+    return calculations
@@ -1,126 +1,456 @@
 import xml.etree.ElementTree as ET
-import json
+import io
+import os
 import re
-from typing import List, Dict, Any
+import sys
+import zipfile
+import hashlib
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Union, Iterator, Tuple, BinaryIO
 
-def extract_datasource_and_dependencies(twb_file_path: str) -> List[Dict[str, Any]]:
+from records import (
+    WorksheetRecord, DatasourceRecord, DependencyRecord, ColumnRecord, ColumnInstanceRecord, ZoneRecord
+)
+from serialization import write_json
+from utils import build_field_index
+import xml_backend
+from mapped_input import open_mapped
+from xml_backend import Query
+import tracing
+
+
+# Consultas XPath compiladas una sola vez (ver xml_backend.py)
+_Q_DASHBOARDS = Query(".//dashboard")
+_Q_WORKSHEETS = Query(".//worksheet")
+_Q_DATASOURCES_CHILD = Query("datasources")
+_Q_DATASOURCE_CHILD = Query("datasource")
+_Q_CONNECTION_CHILD = Query("connection")
+_Q_NESTED_RELATION = Query(".//relation//relation")
+_Q_RUN = Query(".//run")
+_Q_COLS = Query(".//cols")
+_Q_ROWS = Query(".//rows")
+_Q_DATASOURCES = Query(".//datasources")
+_Q_DATASOURCE = Query(".//datasource")
+_Q_DEPENDENCIES = Query(".//datasource-dependencies")
+_Q_COLUMN = Query(".//column")
+_Q_CALCULATION_CHILD = Query("calculation")
+_Q_COLUMN_INSTANCE = Query(".//column-instance")
+_Q_MARK = Query(".//mark")
+_Q_ZONE = Query(".//zone")
+
+
+class WorkbookModel:
     """
-    Extrae información de dependencias de datos y metadatos de cada worksheet
-    desde un archivo Tableau (.twb). Devuelve una lista de diccionarios con la información.
-    También guarda un archivo JSON con los datos extraídos.
+    Modelo de un workbook Tableau (.twb) parseado una sola vez.
+    Expone dashboards, zonas, worksheets, datasources y dependencias a partir
+    del mismo árbol XML, para que todos los extractores lo compartan.
+    """
+
+    def __init__(self, root: Optional[ET.Element]):
+        self.root = root
+        # Índice datasource -> relación/caption/conexión, construido en una sola pasada
+        self.datasource_index = build_datasource_index(root) if root is not None else {}
+        self._dashboards = None
+        self._worksheets = None
+        self._datasources = None
+        self._fingerprints = None
+
+    @property
+    def dashboards(self) -> List[Dict[str, Any]]:
+        """
+        Lista de dashboards con sus worksheets asociados y sus zonas.
+        """
+        if self._dashboards is None:
+            if self.root is None:
+                self._dashboards = []
+            else:
+                self._dashboards = [_build_dashboard_info(d) for d in _Q_DASHBOARDS.findall(self.root)]
+        return self._dashboards
+
+    @property
+    def zones(self) -> List[Dict[str, Any]]:
+        """
+        Todas las zonas de worksheet de todos los dashboards.
+        """
+        return [zone for dashboard in self.dashboards for zone in dashboard["worksheet_zones"]]
+
+    @property
+    def worksheets(self) -> List[Dict[str, Any]]:
+        """
+        Lista de worksheets con el formato {"worksheet": worksheet_info} que consumen los generadores.
+        """
+        if self._worksheets is None:
+            if self.root is None:
+                self._worksheets = []
+            else:
+                self._worksheets = [
+                    {"worksheet": _build_worksheet_info(ws, self.find_relation_name)}
+                    for ws in _Q_WORKSHEETS.findall(self.root)
+                ]
+        return self._worksheets
+
+    @property
+    def datasources(self) -> List[Dict[str, Any]]:
+        """
+        Datasources declarados a nivel de workbook, con caption, relación y conexión.
+        """
+        if self._datasources is None:
+            self._datasources = []
+            if self.root is not None:
+                datasources_tag = _Q_DATASOURCES_CHILD.find(self.root)
+                for datasource in _Q_DATASOURCE_CHILD.findall(datasources_tag) if datasources_tag is not None else []:
+                    self._datasources.append(self.datasource_index[datasource.get("name", "")])
+        return self._datasources
+
+    @property
+    def dependencies(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Dependencias de columnas de cada worksheet, indexadas por nombre de worksheet.
+        """
+        return {
+            ws["worksheet"]["worksheet_name"]: ws["worksheet"]["dependency_info"]
+            for ws in self.worksheets
+        }
+
+    @property
+    def fingerprints(self) -> Dict[str, Dict[str, str]]:
+        """
+        Huella (SHA-256) del subárbol XML de cada worksheet y dashboard:
+        {"worksheets": {nombre: huella}, "dashboards": {nombre: huella}}.
+        """
+        if self._fingerprints is None:
+            self._fingerprints = {"worksheets": {}, "dashboards": {}}
+            if self.root is not None:
+                for worksheet in _Q_WORKSHEETS.findall(self.root):
+                    self._fingerprints["worksheets"][worksheet.get("name", "")] = fingerprint_element(worksheet)
+                for dashboard in _Q_DASHBOARDS.findall(self.root):
+                    self._fingerprints["dashboards"][dashboard.get("name", "")] = fingerprint_element(dashboard)
+        return self._fingerprints
+
+    def find_relation_name(self, datasource_name: str) -> Optional[str]:
+        """
+        Devuelve el nombre de la primera relación anidada del datasource indicado, o None.
+        """
+        entry = self.datasource_index.get(datasource_name)
+        return entry["relation_name"] if entry is not None else None
+
+
+def fingerprint_element(element: ET.Element) -> str:
+    """
+    Devuelve la huella SHA-256 del XML serializado de un elemento y su subárbol.
+    """
+    return hashlib.sha256(xml_backend.tostring(element)).hexdigest()
+
+
+def _index_datasource(index: Dict[str, Dict[str, Any]], datasource: ET.Element) -> None:
+    """
+    Agrega (o completa) la entrada de un elemento <datasource> en el índice.
+    La caption y la conexión vienen del primer datasource con ese nombre; la relación,
+    del primero que tenga una relación anidada (mismo resultado que la antigua consulta
+    ".//datasource[@name='...']//relation//relation").
+    """
+    name = datasource.get("name", "")
+    entry = index.get(name)
+    if entry is None:
+        connection = _Q_CONNECTION_CHILD.find(datasource)
+        entry = index[name] = {
+            "name": name,
+            "caption": datasource.get("caption", ""),
+            "connection_class": connection.get("class", "") if connection is not None else "",
+            "relation_name": None,
+            "relation_table": None,
+            "relation_connection": None
+        }
+    if entry["relation_name"] is None:
+        relation = _Q_NESTED_RELATION.find(datasource)
+        if relation is not None:
+            entry["relation_name"] = relation.get("name", "")
+            entry["relation_table"] = relation.get("table", "")
+            entry["relation_connection"] = relation.get("connection", "")
+
+
+def build_datasource_index(root: ET.Element) -> Dict[str, Dict[str, Any]]:
+    """
+    Recorre todos los <datasource> del workbook una sola vez y devuelve un diccionario
+    nombre -> {caption, connection_class, relation_name, relation_table, relation_connection}.
+    Las búsquedas posteriores son O(1) y no dependen de XPath, por lo que los nombres
+    con comillas funcionan sin problemas.
+    """
+    index = {}
+    with tracing.span("datasource_index", "extract") as index_span:
+        for datasource in root.iter("datasource"):
+            _index_datasource(index, datasource)
+        index_span.set(datasources=len(index))
+    return index
+
+
+# Entrada de un workbook: ruta, contenido en bytes o archivo binario ya abierto
+WorkbookSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+@contextmanager
+def open_workbook_source(twb_file_path: WorkbookSource):
+    """
+    Abre el XML de un workbook Tableau para lectura binaria.
+    Si es un paquete .twbx, transmite directamente el miembro .twb desde el zip
+    sin extraer nada a disco (los .hyper e imágenes del paquete no se leen).
+    También acepta el contenido en bytes o un archivo binario abierto (.twb o .twbx,
+    detectado por el contenido); en ese caso no se abre ni se cierra ningún archivo.
+    """
+    if isinstance(twb_file_path, (bytes, bytearray, memoryview)):
+        twb_file_path = io.BytesIO(twb_file_path)
+    if not isinstance(twb_file_path, (str, os.PathLike)):
+        if not twb_file_path.seekable():
+            twb_file_path = io.BytesIO(twb_file_path.read())
+        start = twb_file_path.tell()
+        if zipfile.is_zipfile(twb_file_path):
+            twb_file_path.seek(start)
+            with zipfile.ZipFile(twb_file_path) as package:
+                with package.open(_find_twb_member(package)) as f:
+                    yield f
+        else:
+            twb_file_path.seek(start)
+            yield twb_file_path
+    elif os.fspath(twb_file_path).lower().endswith(".twbx"):
+        with zipfile.ZipFile(twb_file_path) as package:
+            with package.open(_find_twb_member(package)) as f:
+                yield f
+    else:
+        # El .twb se mapea en memoria: el parser lee directamente las páginas del archivo
+        with open_mapped(twb_file_path) as f:
+            yield f
+
+
+def _find_twb_member(package: zipfile.ZipFile) -> str:
+    """
+    Devuelve el nombre del .twb dentro de un paquete .twbx (prefiere el de la raíz del zip).
+    """
+    members = [name for name in package.namelist() if name.lower().endswith(".twb")]
+    if not members:
+        raise ValueError(f"El paquete no contiene ningún archivo .twb: {package.filename}")
+    return min(members, key=lambda name: (name.count("/"), name))
+
+
+def parse_workbook(twb_file_path: WorkbookSource, strict: bool = False) -> WorkbookModel:
+    """
+    Parsea un archivo Tableau (.twb o .twbx; ruta, bytes o archivo abierto) una única vez y devuelve su WorkbookModel.
+    Si el XML no es válido, devuelve un modelo vacío; con strict, relanza el error (xml_backend.ParseError).
     """
     try:
-        tree = ET.parse(twb_file_path)
-        root = tree.getroot()
-    except ET.ParseError as e:
+        with tracing.span("parse_xml", "extract"), open_workbook_source(twb_file_path) as f:
+            root = xml_backend.parse(f)
+    except xml_backend.ParseError as e:
+        if strict:
+            raise
         print(f"Error al procesar el archivo XML: {e}")
-        return []
+        return WorkbookModel(None)
+    return WorkbookModel(root)
 
-    extracted_data_dependencies = []
-
-    for worksheet in root.findall(".//worksheet"):
-        # Extrae el título del worksheet
-        run_tag = worksheet.find(".//run")
-        worksheet_title = run_tag.text if run_tag is not None else ""
-
-        # Extrae columnas y filas
-        cols_tag = worksheet.find(".//cols")
-        rows_tag = worksheet.find(".//rows")
-        cols_value = cols_tag.text if cols_tag is not None and cols_tag.text is not None else ""
-        rows_value = rows_tag.text if rows_tag is not None and rows_tag.text is not None else ""
-        cols_result = re.findall(r":(.*?):", cols_value)
-        rows_result = re.findall(r":(.*?):", rows_value)
-
-        worksheet_info = {
-            "worksheet_name": worksheet.get("name", ""),
-            "worksheet_title": worksheet_title,
-            "type": worksheet.find(".//mark").get("class", ""),
-            "worksheet_datasources": [],
-            "dependency_info": [],
-            "cols": cols_result,
-            "rows": rows_result
-        }
 
-        # Extrae datasources asociados al worksheet
-        for datasources in worksheet.findall(".//datasources"):
-            for datasource in datasources.findall(".//datasource"):
-                datasource_info = {
-                    "caption": datasource.get("caption", ""),
-                    "name": datasource.get("name", "")
-                }
-                datasource_name = datasource.get("name", "")
-                relation_name = None
-                for relation in root.findall(f".//datasource[@name='{datasource_name}']//relation//relation"):
-                    relation_name = relation.get("name", "")
-                    break
-                datasource_info["relation_name"] = relation_name
-                worksheet_info["worksheet_datasources"].append(datasource_info)
-
-        # Extrae dependencias de columnas
-        for dependencies in worksheet.findall(".//datasource-dependencies"):
-            dependency_info = {
-                "datasource": dependencies.get("datasource", ""),
-                "columns": [],
-                "column_instances": []
-            }
-            for column in dependencies.findall(".//column"):
-                column_info = {
-                    "caption": column.get("caption", ""),
-                    "name": column.get("name", ""),
-                    "role": column.get("role", ""),
-                    "calculation_formula": column.find("calculation").get("formula", "") if column.find("calculation") is not None else ""
-                }
-                dependency_info["columns"].append(column_info)
-            for column_instance in dependencies.findall(".//column-instance"):
-                column_instance_info = {
-                    "column": column_instance.get("column", ""),
-                    "derivation": column_instance.get("derivation", "")
-                }
-                dependency_info["column_instances"].append(column_instance_info)
-            worksheet_info["dependency_info"].append(dependency_info)
-
-        extracted_data_dependencies.append({
-            "worksheet": worksheet_info
-        })
-
-    # Guarda el archivo JSON con los datos extraídos
-    with open("extracted_data_dependencies.json", "w", encoding="utf-8") as f:
-        json.dump(extracted_data_dependencies, f, ensure_ascii=False, indent=2)
-        print("Archivo JSON generado con los datos extraídos.")
-    return extracted_data_dependencies
+def as_workbook_model(source: Union[str, WorkbookModel]) -> WorkbookModel:
+    """
+    Acepta una ruta a un .twb o un WorkbookModel ya parseado.
+    """
+    return source if isinstance(source, WorkbookModel) else parse_workbook(source)
+
 
-def extract_dashboards_and_worksheets(twb_file_path: str) -> List[Dict[str, Any]]:
+def _build_worksheet_info(worksheet: ET.Element, find_relation_name) -> WorksheetRecord:
     """
-    Extrae los dashboards y los worksheets asociados desde un archivo Tableau (.twb).
-    Devuelve una lista de diccionarios con el nombre del dashboard, los worksheets asociados y sus posiciones/tamaños.
+    Construye el registro worksheet_info (WorksheetRecord, compatible con dict) a partir de un elemento <worksheet>.
+    find_relation_name resuelve el nombre de relación de cada datasource.
     """
+    # Extrae el título del worksheet
+    run_tag = _Q_RUN.find(worksheet)
+    worksheet_title = run_tag.text if run_tag is not None else ""
+
+    # Extrae columnas y filas
+    cols_tag = _Q_COLS.find(worksheet)
+    rows_tag = _Q_ROWS.find(worksheet)
+    cols_value = cols_tag.text if cols_tag is not None and cols_tag.text is not None else ""
+    rows_value = rows_tag.text if rows_tag is not None and rows_tag.text is not None else ""
+    cols_result = re.findall(r":(.*?):", cols_value)
+    rows_result = re.findall(r":(.*?):", rows_value)
+
+    # Extrae datasources asociados al worksheet
+    worksheet_datasources = []
+    for datasources in _Q_DATASOURCES.findall(worksheet):
+        for datasource in _Q_DATASOURCE.findall(datasources):
+            worksheet_datasources.append(DatasourceRecord(
+                caption=datasource.get("caption", ""),
+                name=datasource.get("name", ""),
+                relation_name=find_relation_name(datasource.get("name", ""))
+            ))
+
+    # Extrae dependencias de columnas
+    dependency_info = []
+    datatypes = {}
+    for dependencies in _Q_DEPENDENCIES.findall(worksheet):
+        columns = []
+        for column in _Q_COLUMN.findall(dependencies):
+            calculation = _Q_CALCULATION_CHILD.find(column)
+            datatypes.setdefault(column.get("name", ""), column.get("datatype", ""))
+            columns.append(ColumnRecord(
+                caption=column.get("caption", ""),
+                name=column.get("name", ""),
+                role=sys.intern(column.get("role", "")),
+                calculation_formula=calculation.get("formula", "") if calculation is not None else ""
+            ))
+        column_instances = []
+        for column_instance in _Q_COLUMN_INSTANCE.findall(dependencies):
+            column_instances.append(ColumnInstanceRecord(
+                column=column_instance.get("column", ""),
+                derivation=sys.intern(column_instance.get("derivation", ""))
+            ))
+        dependency_info.append(DependencyRecord(
+            datasource=dependencies.get("datasource", ""),
+            columns=columns,
+            column_instances=column_instances
+        ))
+
+    return WorksheetRecord(
+        worksheet_name=worksheet.get("name", ""),
+        worksheet_title=worksheet_title,
+        type=_Q_MARK.find(worksheet).get("class", ""),
+        worksheet_datasources=worksheet_datasources,
+        dependency_info=dependency_info,
+        cols=cols_result,
+        rows=rows_result,
+        field_index=build_field_index(dependency_info, datatypes)
+    )
+
+
+def _build_dashboard_info(dashboard: ET.Element) -> Dict[str, Any]:
+    """
+    Construye el diccionario de un dashboard con sus worksheets y zonas.
+    """
+    worksheet_names = []
+    # Nombres ya agregados: evita recorrer la lista por cada zona
+    seen_names = set()
+    worksheet_zones = []
+    for zone in _Q_ZONE.findall(dashboard):
+        ws_name = zone.get("name")
+        if ws_name and ws_name not in seen_names:
+            seen_names.add(ws_name)
+            worksheet_names.append(ws_name)
+        if ws_name:
+            zone_info = ZoneRecord(
+                worksheet_name=ws_name,
+                x=int(zone.get("x", 0)),
+                y=int(zone.get("y", 0)),
+                width=int(zone.get("w", 300)),
+                height=int(zone.get("h", 300))
+            )
+            worksheet_zones.append(zone_info)
+    return {
+        "dashboard_name": dashboard.get("name", ""),
+        "worksheet_names": worksheet_names,
+        "worksheet_zones": worksheet_zones
+    }
+
+
+def iter_workbook_records(twb_file_path: WorkbookSource, fingerprints: Optional[Dict[str, Dict[str, str]]] = None,
+                          strict: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Recorre un archivo Tableau (.twb o .twbx) en modo streaming con iterparse (ver xml_backend.py).
+    Emite ("worksheet", {"worksheet": worksheet_info}) y ("dashboard", dashboard_info)
+    en cuanto se cierra cada elemento, y libera los subárboles ya procesados para que
+    la memoria no crezca con el tamaño del archivo.
+    Las relaciones se resuelven con los datasources del workbook, que Tableau
+    escribe antes que los worksheets.
+    Si se pasa fingerprints, se completa con la misma estructura que WorkbookModel.fingerprints.
+    Si el XML no es válido el recorrido termina en el error (informado con print); con strict,
+    el error (xml_backend.ParseError) se relanza después de los registros ya emitidos.
+    """
+    datasource_index = {}
+
+    def find_relation_name(datasource_name):
+        entry = datasource_index.get(datasource_name)
+        return entry["relation_name"] if entry is not None else None
+
+    stack = []
     try:
-        tree = ET.parse(twb_file_path)
-        root = tree.getroot()
-    except ET.ParseError as e:
+        with open_workbook_source(twb_file_path) as f:
+            for event, elem in xml_backend.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                parent = stack[-1] if stack else None
+                # Solo se procesan (y liberan) los elementos de primer y segundo nivel bajo <workbook>
+                if parent is None or len(stack) > 2:
+                    continue
+                parent_tag = parent.tag
+                if elem.tag == "datasource" and parent_tag == "datasources":
+                    _index_datasource(datasource_index, elem)
+                elif elem.tag == "worksheet" and parent_tag == "worksheets":
+                    if fingerprints is not None:
+                        fingerprints.setdefault("worksheets", {})[elem.get("name", "")] = fingerprint_element(elem)
+                    yield "worksheet", {"worksheet": _build_worksheet_info(elem, find_relation_name)}
+                elif elem.tag == "dashboard" and parent_tag == "dashboards":
+                    if fingerprints is not None:
+                        fingerprints.setdefault("dashboards", {})[elem.get("name", "")] = fingerprint_element(elem)
+                    yield "dashboard", _build_dashboard_info(elem)
+                elem.clear()
+                parent.remove(elem)
+    except xml_backend.ParseError as e:
+        if strict:
+            raise
         print(f"Error al procesar el archivo XML: {e}")
-        return []
+
+
+def extract_workbook_streaming(twb_file_path: WorkbookSource, fingerprints: Optional[Dict[str, Dict[str, str]]] = None,
+                               strict: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Extrae dashboards y worksheets en modo streaming (ver iter_workbook_records).
+    Devuelve (dashboards, extracted_data) con los mismos diccionarios que
+    extract_dashboards_and_worksheets y extract_datasource_and_dependencies,
+    sin mantener el árbol XML completo en memoria. Con strict, un XML inválido lanza
+    xml_backend.ParseError en lugar de devolver lo extraído hasta el error.
+    """
     dashboards = []
-    for dashboard in root.findall(".//dashboard"):
-        dashboard_name = dashboard.get("name", "")
-        worksheet_names = []
-        worksheet_zones = []
-        for zone in dashboard.findall(".//zone"):
-            ws_name = zone.get("name")
-            if ws_name and ws_name not in worksheet_names:
-                worksheet_names.append(ws_name)
-            if ws_name:
-                zone_info = {
-                    "worksheet_name": ws_name,
-                    "x": int(zone.get("x", 0)),
-                    "y": int(zone.get("y", 0)),
-                    "width": int(zone.get("w", 300)),
-                    "height": int(zone.get("h", 300))
-                }
-                worksheet_zones.append(zone_info)
-        dashboards.append({
-            "dashboard_name": dashboard_name,
-            "worksheet_names": worksheet_names,
-            "worksheet_zones": worksheet_zones 
-        })
-    return dashboards
\ No newline at end of file
+    extracted_data = []
+    with tracing.span("parse_streaming", "extract"):
+        for kind, record in iter_workbook_records(twb_file_path, fingerprints, strict):
+            if kind == "dashboard":
+                dashboards.append(record)
+            else:
+                extracted_data.append(record)
+    return dashboards, extracted_data
+
+
+def extract_datasource_and_dependencies(twb_file_path: Union[str, WorkbookModel], save_json: bool = True) -> List[Dict[str, Any]]:
+    """
+    Extrae información de dependencias de datos y metadatos de cada worksheet
+    desde un archivo Tableau (.twb) o un WorkbookModel ya parseado.
+    Devuelve una lista de diccionarios con la información.
+    Si save_json es True, también guarda un archivo JSON con los datos extraídos.
+    """
+    model = as_workbook_model(twb_file_path)
+    if model.root is None:
+        return []
+
+    with tracing.span("extract_worksheets", "extract"):
+        extracted_data_dependencies = model.worksheets
+
+    if save_json:
+        save_extracted_data(extracted_data_dependencies)
+    return extracted_data_dependencies
+
+
+def save_extracted_data(extracted_data_dependencies: List[Dict[str, Any]],
+                        path: str = "extracted_data_dependencies.json", serializer=None) -> None:
+    """
+    Guarda el archivo JSON con los datos extraídos de los worksheets.
+    """
+    write_json(path, extracted_data_dependencies, serializer)
+    print("Archivo JSON generado con los datos extraídos.")
+
+def extract_dashboards_and_worksheets(twb_file_path: Union[str, WorkbookModel]) -> List[Dict[str, Any]]:
+    """
+    Extrae los dashboards y los worksheets asociados desde un archivo Tableau (.twb)
+    o un WorkbookModel ya parseado.
+    Devuelve una lista de diccionarios con el nombre del dashboard, los worksheets asociados y sus posiciones/tamaños.
+    """
+    model = as_workbook_model(twb_file_path)
+    with tracing.span("extract_dashboards", "extract"):
+        return model.dashboards
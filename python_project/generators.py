@@ -1,19 +1,16 @@
-from utils import generar_hex_metodo
+import threading
+
+from utils import IdRegistry, normalize_field, field_index_for
+from templates import VisualTemplate, Slot, Format
+from dax import calculations_for
+
 def is_dimension(field, worksheet):
     """
     Devuelve True si el campo es una dimensión según el atributo 'role' en dependency_info.
+    Usa el índice de campos del worksheet (búsqueda O(1) por nombre o caption normalizado).
     """
-    # Normaliza el nombre quitando corchetes
-    def normalize(f):
-        return f.replace('[', '').replace(']', '').lower()
-    field_norm = normalize(field)
-    for dep in worksheet.get("dependency_info", []):
-        for col in dep.get("columns", []):
-            name_norm = normalize(col.get("name", ""))
-            caption_norm = normalize(col.get("caption", ""))
-            if field_norm == name_norm or (caption_norm and field_norm == caption_norm):
-                return col.get("role", "").lower() == "dimension"
-    return False
+    field_info = field_index_for(worksheet).get(normalize_field(field))
+    return field_info is not None and field_info["role"].lower() == "dimension"
 
 def get_visual_generator_by_type(worksheet_type, worksheet):
     """
@@ -40,295 +37,90 @@ def get_visual_generator_by_type(worksheet_type, worksheet):
     }
     return visual_type_map.get(worksheet_type.lower(), generate_json_table)
 
-#Función para gráfico de columnas
-def generate_json_column_graph(
-    extracted_data, name,
-    position_X=50, position_Y=50, position_width=500, position_height=350, position_Z=2
-):
-    if (position_X, position_Y, position_width, position_height, position_Z) == (50, 50, 500, 350, 2):
-        print("[DEFAULT]")
-    else:
-        print("[CUSTOM]")
-    worksheet_data = extracted_data[0]
-    worksheet = worksheet_data["worksheet"]
-    worksheet_title = worksheet["worksheet_title"]
-    worksheet_relation = worksheet["worksheet_datasources"][0].get('caption', '')
-    worksheet_cols = worksheet["cols"][0] if worksheet["cols"] else ""
-    worksheet_rows = worksheet["rows"][0] if worksheet["rows"] else ""
-    worksheet_derivation = {
-        "Sum": 0, "Promedio": 1, "Recuento(distintivo)": 2, "Minimo": 3, "Maximo": 4,
-        "Recuento": 5, "Mediana": 6, "DesviacionEstándar": 7, "Varianza": 8, "None": 0
-    }.get(worksheet["dependency_info"][0]["column_instances"][0].get("derivation", ""), 0)
-    direction = "Ascending"
-    isDefaultSort_true = True
-    drillFilterOtherVisuals = True
+# Mapa de derivaciones de Tableau a funciones de agregación de Power BI
+DERIVATION_FUNCTIONS = {
+    "Sum": 0, "Promedio": 1, "Recuento(distintivo)": 2, "Minimo": 3, "Maximo": 4,
+    "Recuento": 5, "Mediana": 6, "DesviacionEstándar": 7, "Varianza": 8, "None": 0
+}
 
-    data = {
-        "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.0.0/schema.json",
-        "name": name,
-        "position": {
-            "x": position_X,
-            "y": position_Y,
-            "z": position_Z,
-            "height": position_height,
-            "width": position_width
-        },
-        "visual": {
-            "visualType": "clusteredColumnChart",
-            "query": {
-                "queryState": {
-                    "Category": {
-                        "projections": [
-                            {
-                                "field": {
-                                    "Column": {
-                                        "Expression": {
-                                            "SourceRef": {
-                                                "Entity": worksheet_relation
-                                            }
-                                        },
-                                        "Property": worksheet_cols
-                                    }
-                                },
-                                "queryRef": f"{worksheet_relation}.{worksheet_cols}",
-                                "nativeQueryRef": worksheet_cols,
-                                "active": True
-                            }
-                        ]
-                    },
-                    "Y": {
-                        "projections": [
-                            {
-                                "field": {
-                                    "Aggregation": {
-                                        "Expression": {
-                                            "Column": {
-                                                "Expression": {
-                                                    "SourceRef": {
-                                                        "Entity": worksheet_relation
-                                                    }
-                                                },
-                                                "Property": worksheet_rows
-                                            }
-                                        },
-                                        "Function": worksheet_derivation
-                                    }
-                                },
-                                "queryRef": f"Sum({worksheet_relation}.{worksheet_rows})",
-                                "nativeQueryRef": f"Suma de {worksheet_rows}"
-                            }
-                        ]
-                    }
-                },
-                "sortDefinition": {
-                    "sort": [
-                        {
-                            "field": {
-                                "Column": {
-                                    "Expression": {
-                                        "SourceRef": {
-                                            "Entity": worksheet_relation
-                                        }
-                                    },
-                                    "Property": worksheet_rows
-                                }
-                            },
-                            "direction": direction
-                        }
-                    ],
-                    "isDefaultSort": isDefaultSort_true
+VISUAL_CONTAINER_SCHEMA = "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.0.0/schema.json"
+
+
+def _chart_skeleton(visual_type, sort_on, sort_direction, with_tab_order, with_filters, measure=False):
+    """
+    Esqueleto común de los gráficos categoría/valor (columnas, barras, línea y torta).
+    sort_on indica el campo del orden: "rows" (columna de valores), "cols" (columna de
+    categoría) o "aggregation" (agregación de los valores).
+    Con measure=True el valor es una medida DAX (campo calculado de Tableau, ver dax.py)
+    y se referencia sin agregación.
+    """
+    category_column = {
+        "Column": {
+            "Expression": {
+                "SourceRef": {
+                    "Entity": Slot("entity")
                 }
             },
-            "visualContainerObjects": {
-                "title": [
-                    {
-                        "properties": {
-                            "text": {
-                                "expr": {
-                                    "Literal": {
-                                        "Value": worksheet_title
-                                    }
-                                }
-                            }
-                        }
-                    }
-                ]
-            },
-            "drillFilterOtherVisuals": drillFilterOtherVisuals
+            "Property": Slot("category")
         }
     }
-    return data
-
-#Función para gráfico de barras
-def generate_json_bar_graph(
-    extracted_data, name,
-    position_X=50, position_Y=50, position_width=500, position_height=350, position_Z=2
-):
-    if (position_X, position_Y, position_width, position_height, position_Z) == (50, 50, 500, 350, 2):
-        print("[DEFAULT]")
-    else:
-        print("[CUSTOM]")
-        print(f"Custom position: X={position_X}, Y={position_Y}, Width={position_width}, Height={position_height}, Z={position_Z}")
-    worksheet_data = extracted_data[0]
-    worksheet = worksheet_data["worksheet"]
-    worksheet_title = worksheet["worksheet_title"]
-    worksheet_relation = worksheet["worksheet_datasources"][0].get('caption', '')
-    worksheet_cols = worksheet["cols"][0] if worksheet["cols"] else ""
-    worksheet_rows = worksheet["rows"][0] if worksheet["rows"] else ""
-    worksheet_derivation = {
-        "Sum": 0, "Promedio": 1, "Recuento(distintivo)": 2, "Minimo": 3, "Maximo": 4,
-        "Recuento": 5, "Mediana": 6, "DesviacionEstándar": 7, "Varianza": 8, "None": 0
-    }.get(worksheet["dependency_info"][0]["column_instances"][0].get("derivation", ""), 0)
-    direction = "Ascending"
-    isDefaultSort_true = True
-    drillFilterOtherVisuals = True
-
-    data = {
-        "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.0.0/schema.json",
-        "name": name,
-        "position": {
-            "x": position_X,
-            "y": position_Y,
-            "z": position_Z,
-            "height": position_height,
-            "width": position_width
-        },
-        "visual": {
-            "visualType": "barChart",
-            "query": {
-                "queryState": {
-                    "Category": {
-                        "projections": [
-                            {
-                                "field": {
-                                    "Column": {
-                                        "Expression": {
-                                            "SourceRef": {
-                                                "Entity": worksheet_relation
-                                            }
-                                        },
-                                        "Property": worksheet_cols
-                                    }
-                                },
-                                "queryRef": f"{worksheet_relation}.{worksheet_cols}",
-                                "nativeQueryRef": worksheet_cols,
-                                "active": True
-                            }
-                        ]
-                    },
-                    "Y": {
-                        "projections": [
-                            {
-                                "field": {
-                                    "Aggregation": {
-                                        "Expression": {
-                                            "Column": {
-                                                "Expression": {
-                                                    "SourceRef": {
-                                                        "Entity": worksheet_relation
-                                                    }
-                                                },
-                                                "Property": worksheet_rows
-                                            }
-                                        },
-                                        "Function": worksheet_derivation
-                                    }
-                                },
-                                "queryRef": f"Sum({worksheet_relation}.{worksheet_rows})",
-                                "nativeQueryRef": f"Suma de {worksheet_rows}"
-                            }
-                        ]
-                    }
-                },
-                "sortDefinition": {
-                    "sort": [
-                        {
-                            "field": {
-                                "Column": {
-                                    "Expression": {
-                                        "SourceRef": {
-                                            "Entity": worksheet_relation
-                                        }
-                                    },
-                                    "Property": worksheet_rows
-                                }
-                            },
-                            "direction": direction
-                        }
-                    ],
-                    "isDefaultSort": isDefaultSort_true
+    value_column = {
+        "Column": {
+            "Expression": {
+                "SourceRef": {
+                    "Entity": Slot("entity")
                 }
             },
-            "visualContainerObjects": {
-                "title": [
-                    {
-                        "properties": {
-                            "text": {
-                                "expr": {
-                                    "Literal": {
-                                        "Value": worksheet_title
-                                    }
-                                }
-                            }
-                        }
-                    }
-                ]
-            },
-            "drillFilterOtherVisuals": drillFilterOtherVisuals
+            "Property": Slot("value")
         }
     }
-    return data
+    value_aggregation = {
+        "Aggregation": {
+            "Expression": value_column,
+            "Function": Slot("aggregation")
+        }
+    }
+    value_query_ref = Format("Sum({entity}.{value})")
+    value_native_query_ref = Format("Suma de {value}")
+    if measure:
+        value_column = value_aggregation = {
+            "Measure": {
+                "Expression": {
+                    "SourceRef": {
+                        "Entity": Slot("entity")
+                    }
+                },
+                "Property": Slot("value")
+            }
+        }
+        value_query_ref = Format("{entity}.{value}")
+        value_native_query_ref = Slot("value")
+    sort_field = {"rows": value_column, "cols": category_column, "aggregation": value_aggregation}[sort_on]
 
-#Función para gráfico de torta
-def generate_json_pie(
-    extracted_data, name,
-    position_X=50, position_Y=50, position_width=400, position_height=400, position_Z=2
-):
-    if (position_X, position_Y, position_width, position_height, position_Z) == (50, 50, 400, 400, 2):
-        print("[DEFAULT]")
-    else:
-        print("[CUSTOM]")
-    worksheet_data = extracted_data[0]
-    worksheet = worksheet_data["worksheet"]
-    worksheet_title = worksheet["worksheet_title"]
-    worksheet_relation = worksheet["worksheet_datasources"][0].get('caption', '')
-    worksheet_cols = worksheet["cols"][0] if worksheet["cols"] else ""
-    worksheet_rows = worksheet["rows"][0] if worksheet["rows"] else ""
-    worksheet_derivation = {
-        "Sum": 0, "Promedio": 1, "Recuento(distintivo)": 2, "Minimo": 3, "Maximo": 4,
-        "Recuento": 5, "Mediana": 6, "DesviacionEstándar": 7, "Varianza": 8, "None": 0
-    }.get(worksheet["dependency_info"][0]["column_instances"][0].get("derivation", ""), 0)
+    position = {
+        "x": Slot("x"),
+        "y": Slot("y"),
+        "z": Slot("z"),
+        "height": Slot("height"),
+        "width": Slot("width")
+    }
+    if with_tab_order:
+        position["tabOrder"] = 0
 
-    data = {
-        "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.0.0/schema.json",
-        "name": name,
-        "position": {
-            "x": position_X,
-            "y": position_Y,
-            "z": position_Z,
-            "height": position_height,
-            "width": position_width,
-            "tabOrder": 0
-        },
+    skeleton = {
+        "$schema": VISUAL_CONTAINER_SCHEMA,
+        "name": Slot("name"),
+        "position": position,
         "visual": {
-            "visualType": "pieChart",
+            "visualType": visual_type,
             "query": {
                 "queryState": {
                     "Category": {
                         "projections": [
                             {
-                                "field": {
-                                    "Column": {
-                                        "Expression": {
-                                            "SourceRef": {
-                                                "Entity": worksheet_relation
-                                            }
-                                        },
-                                        "Property": worksheet_cols
-                                    }
-                                },
-                                "queryRef": f"{worksheet_relation}.{worksheet_cols}",
-                                "nativeQueryRef": worksheet_cols,
+                                "field": category_column,
+                                "queryRef": Format("{entity}.{category}"),
+                                "nativeQueryRef": Slot("category"),
                                 "active": True
                             }
                         ]
@@ -336,23 +128,9 @@ def generate_json_pie(
                     "Y": {
                         "projections": [
                             {
-                                "field": {
-                                    "Aggregation": {
-                                        "Expression": {
-                                            "Column": {
-                                                "Expression": {
-                                                    "SourceRef": {
-                                                        "Entity": worksheet_relation
-                                                    }
-                                                },
-                                                "Property": worksheet_rows
-                                            }
-                                        },
-                                        "Function": worksheet_derivation
-                                    }
-                                },
-                                "queryRef": f"Sum({worksheet_relation}.{worksheet_rows})",
-                                "nativeQueryRef": f"Suma de {worksheet_rows}"
+                                "field": value_aggregation,
+                                "queryRef": value_query_ref,
+                                "nativeQueryRef": value_native_query_ref
                             }
                         ]
                     }
@@ -360,22 +138,8 @@ def generate_json_pie(
                 "sortDefinition": {
                     "sort": [
                         {
-                            "field": {
-                                "Aggregation": {
-                                    "Expression": {
-                                        "Column": {
-                                            "Expression": {
-                                                "SourceRef": {
-                                                    "Entity": worksheet_relation
-                                                }
-                                            },
-                                            "Property": worksheet_rows
-                                        }
-                                    },
-                                    "Function": worksheet_derivation
-                                }
-                            },
-                            "direction": "Descending"
+                            "field": sort_field,
+                            "direction": sort_direction
                         }
                     ],
                     "isDefaultSort": True
@@ -388,7 +152,7 @@ def generate_json_pie(
                             "text": {
                                 "expr": {
                                     "Literal": {
-                                        "Value": worksheet_title
+                                        "Value": Slot("title")
                                     }
                                 }
                             }
@@ -397,51 +161,141 @@ def generate_json_pie(
                 ]
             },
             "drillFilterOtherVisuals": True
-        },
-        "filterConfig": {
+        }
+    }
+    if with_filters:
+        skeleton["filterConfig"] = {
             "filters": [
                 {
-                    "name": generar_hex_metodo(),
-                    "field": {
-                        "Column": {
-                            "Expression": {
-                                "SourceRef": {
-                                    "Entity": worksheet_relation
-                                }
-                            },
-                            "Property": worksheet_cols
-                        }
-                    },
+                    "name": Slot("category_filter_name"),
+                    "field": category_column,
                     "type": "Categorical"
                 },
                 {
-                    "name": generar_hex_metodo(),
-                    "field": {
-                        "Aggregation": {
-                            "Expression": {
-                                "Column": {
-                                    "Expression": {
-                                        "SourceRef": {
-                                            "Entity": worksheet_relation
-                                        }
-                                    },
-                                    "Property": worksheet_rows
-                                }
-                            },
-                            "Function": worksheet_derivation
-                        }
-                    },
+                    "name": Slot("value_filter_name"),
+                    "field": value_aggregation,
                     "type": "Advanced"
                 }
             ]
         }
+    return skeleton
+
+
+# Plantillas compiladas una sola vez al importar el módulo
+COLUMN_TEMPLATE = VisualTemplate(_chart_skeleton("clusteredColumnChart", "rows", "Ascending", False, False))
+BAR_TEMPLATE = VisualTemplate(_chart_skeleton("barChart", "rows", "Ascending", False, False))
+PIE_TEMPLATE = VisualTemplate(_chart_skeleton("pieChart", "aggregation", "Descending", True, True))
+LINE_TEMPLATE = VisualTemplate(_chart_skeleton("lineChart", "cols", "Ascending", True, True))
+# Variantes con el valor como medida DAX
+COLUMN_MEASURE_TEMPLATE = VisualTemplate(_chart_skeleton("clusteredColumnChart", "rows", "Ascending", False, False, True))
+BAR_MEASURE_TEMPLATE = VisualTemplate(_chart_skeleton("barChart", "rows", "Ascending", False, False, True))
+PIE_MEASURE_TEMPLATE = VisualTemplate(_chart_skeleton("pieChart", "aggregation", "Descending", True, True, True))
+LINE_MEASURE_TEMPLATE = VisualTemplate(_chart_skeleton("lineChart", "cols", "Ascending", True, True, True))
+
+
+def _translated_field(field, calculations):
+    """
+    Devuelve (propiedad, es_medida) de un campo de cols/rows: si es un campo calculado con
+    traducción a DAX, el nombre de su medida o columna en Power BI; si no, el campo tal cual.
+    """
+    calculation = calculations.get(normalize_field(field))
+    if calculation is None or calculation.error:
+        return field, False
+    return calculation.name, calculation.kind == "measure"
+
+
+def _entity(worksheet, names):
+    """
+    Tabla (Entity) de los campos del visual: el nombre del datasource en el modelo semántico
+    (names, ver semantic_model.model_names) o, si no se indica, su caption.
+    """
+    datasource = worksheet["worksheet_datasources"][0]
+    table = (names or {}).get("tables", {}).get(datasource.get("name", ""))
+    return table or datasource.get('caption', '')
+
+
+def _render_chart(template, measure_template, extracted_data, name,
+                  position_X, position_Y, position_width, position_height, position_Z, names=None):
+    """
+    Rellena una plantilla de gráfico con los datos del primer worksheet de extracted_data.
+    Si el valor es un campo calculado traducido como medida, usa measure_template.
+    names fija los nombres de tablas y campos calculados del modelo semántico.
+    """
+    worksheet = extracted_data[0]["worksheet"]
+    calculations = calculations_for(worksheet, names=names)
+    category, _ = _translated_field(worksheet["cols"][0] if worksheet["cols"] else "", calculations)
+    value, value_is_measure = _translated_field(worksheet["rows"][0] if worksheet["rows"] else "", calculations)
+    if value_is_measure:
+        template = measure_template
+    values = {
+        "name": name,
+        "x": position_X,
+        "y": position_Y,
+        "z": position_Z,
+        "height": position_height,
+        "width": position_width,
+        "entity": _entity(worksheet, names),
+        "category": category,
+        "value": value,
+        "aggregation": DERIVATION_FUNCTIONS.get(
+            worksheet["dependency_info"][0]["column_instances"][0].get("derivation", ""), 0
+        ),
+        "title": worksheet["worksheet_title"]
     }
-    return data
+    if "category_filter_name" in template.slots:
+        # IDs deterministas de los filtros, derivados del nombre del visual y del campo
+        filter_ids = IdRegistry()
+        values["category_filter_name"] = filter_ids.new_id(name, "filter", category, "Categorical")
+        values["value_filter_name"] = filter_ids.new_id(name, "filter", value, "Advanced")
+    return template.render(values)
+
+#Función para gráfico de columnas
+def generate_json_column_graph(
+    extracted_data, name,
+    position_X=50, position_Y=50, position_width=500, position_height=350, position_Z=2, names=None
+):
+    if (position_X, position_Y, position_width, position_height, position_Z) == (50, 50, 500, 350, 2):
+        print("[DEFAULT]")
+    else:
+        print("[CUSTOM]")
+    return _render_chart(
+        COLUMN_TEMPLATE, COLUMN_MEASURE_TEMPLATE, extracted_data, name,
+        position_X, position_Y, position_width, position_height, position_Z, names
+    )
+
+#Función para gráfico de barras
+def generate_json_bar_graph(
+    extracted_data, name,
+    position_X=50, position_Y=50, position_width=500, position_height=350, position_Z=2, names=None
+):
+    if (position_X, position_Y, position_width, position_height, position_Z) == (50, 50, 500, 350, 2):
+        print("[DEFAULT]")
+    else:
+        print("[CUSTOM]")
+        print(f"Custom position: X={position_X}, Y={position_Y}, Width={position_width}, Height={position_height}, Z={position_Z}")
+    return _render_chart(
+        BAR_TEMPLATE, BAR_MEASURE_TEMPLATE, extracted_data, name,
+        position_X, position_Y, position_width, position_height, position_Z, names
+    )
+
+#Función para gráfico de torta
+def generate_json_pie(
+    extracted_data, name,
+    position_X=50, position_Y=50, position_width=400, position_height=400, position_Z=2, names=None
+):
+    if (position_X, position_Y, position_width, position_height, position_Z) == (50, 50, 400, 400, 2):
+        print("[DEFAULT]")
+    else:
+        print("[CUSTOM]")
+    return _render_chart(
+        PIE_TEMPLATE, PIE_MEASURE_TEMPLATE, extracted_data, name,
+        position_X, position_Y, position_width, position_height, position_Z, names
+    )
 
 #Función para gráfico de tablas
 def generate_json_table(
     extracted_data, name,
-    position_X=50, position_Y=50, position_width=600, position_height=300, position_Z=2, tabOrder=2
+    position_X=50, position_Y=50, position_width=600, position_height=300, position_Z=2, tabOrder=2, names=None
 ):
     if (position_X, position_Y, position_width, position_height, position_Z) == (50, 50, 600, 300, 2):
         print("[DEFAULT]")
@@ -450,40 +304,37 @@ def generate_json_table(
     worksheet_data = extracted_data[0]
     worksheet = worksheet_data["worksheet"]
     worksheet_title = worksheet["worksheet_title"]
-    worksheet_relation = worksheet["worksheet_datasources"][0].get('caption', '')
+    worksheet_relation = _entity(worksheet, names)
     worksheet_cols = worksheet.get("cols") or [col["name"].strip("[]") for col in worksheet.get("dependency_info", [{}])[0].get("columns", [])] or ["ColumnaDefault"]
 
     # Proyecciones y filtros dinámicos para cada columna
     projections = []
     filters = []
+    filter_ids = IdRegistry()
+    calculations = calculations_for(worksheet, names=names)
     for col in worksheet_cols:
+        # Campos calculados: el nombre de su medida o columna DAX
+        col, is_measure = _translated_field(col, calculations)
+        field = {
+            "Measure" if is_measure else "Column": {
+                "Expression": {
+                    "SourceRef": {
+                        "Entity": worksheet_relation
+                    }
+                },
+                "Property": col
+            }
+        }
+        filter_type = "Advanced" if is_measure else "Categorical"
         projections.append({
-            "field": {
-                "Column": {
-                    "Expression": {
-                        "SourceRef": {
-                            "Entity": worksheet_relation
-                        }
-                    },
-                    "Property": col
-                }
-            },
+            "field": field,
             "queryRef": f"{worksheet_relation}.{col}",
             "nativeQueryRef": col
         })
         filters.append({
-            "name": generar_hex_metodo(),
-            "field": {
-                "Column": {
-                    "Expression": {
-                        "SourceRef": {
-                            "Entity": worksheet_relation
-                        }
-                    },
-                    "Property": col
-                }
-            },
-            "type": "Categorical"
+            "name": filter_ids.new_id(name, "filter", col, filter_type),
+            "field": field,
+            "type": filter_type
         })
 
     data = {
@@ -532,153 +383,100 @@ def generate_json_table(
 #Función para gráfico de línea
 def generate_json_line_graph(
     extracted_data, name,
-    position_X=50, position_Y=50, position_width=600, position_height=350, position_Z=2
+    position_X=50, position_Y=50, position_width=600, position_height=350, position_Z=2, names=None
 ):
     if (position_X, position_Y, position_width, position_height, position_Z) == (50, 50, 600, 350, 2):
         print("[DEFAULT]")
     else:
         print("[CUSTOM]")
-    worksheet_data = extracted_data[0]
-    worksheet = worksheet_data["worksheet"]
-    worksheet_title = worksheet["worksheet_title"]
-    worksheet_relation = worksheet["worksheet_datasources"][0].get('caption', '')
-    worksheet_cols = worksheet["cols"][0] if worksheet["cols"] else ""
-    worksheet_rows = worksheet["rows"][0] if worksheet["rows"] else ""
-    worksheet_derivation = {
-        "Sum": 0, "Promedio": 1, "Recuento(distintivo)": 2, "Minimo": 3, "Maximo": 4,
-        "Recuento": 5, "Mediana": 6, "DesviacionEstándar": 7, "Varianza": 8, "None": 0
-    }.get(worksheet["dependency_info"][0]["column_instances"][0].get("derivation", ""), 0)
+    return _render_chart(
+        LINE_TEMPLATE, LINE_MEASURE_TEMPLATE, extracted_data, name,
+        position_X, position_Y, position_width, position_height, position_Z, names
+    )
 
-    data = {
-        "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/visualContainer/2.0.0/schema.json",
-        "name": name,
-        "position": {
-            "x": position_X,
-            "y": position_Y,
-            "z": position_Z,
-            "height": position_height,
-            "width": position_width,
-            "tabOrder": 0
-        },
-        "visual": {
-            "visualType": "lineChart",
-            "query": {
-                "queryState": {
-                    "Category": {
-                        "projections": [
-                            {
-                                "field": {
-                                    "Column": {
-                                        "Expression": {
-                                            "SourceRef": {
-                                                "Entity": worksheet_relation
-                                            }
-                                        },
-                                        "Property": worksheet_cols
-                                    }
-                                },
-                                "queryRef": f"{worksheet_relation}.{worksheet_cols}",
-                                "nativeQueryRef": worksheet_cols,
-                                "active": True
-                            }
-                        ]
-                    },
-                    "Y": {
-                        "projections": [
-                            {
-                                "field": {
-                                    "Aggregation": {
-                                        "Expression": {
-                                            "Column": {
-                                                "Expression": {
-                                                    "SourceRef": {
-                                                        "Entity": worksheet_relation
-                                                    }
-                                                },
-                                                "Property": worksheet_rows
-                                            }
-                                        },
-                                        "Function": worksheet_derivation
-                                    }
-                                },
-                                "queryRef": f"Sum({worksheet_relation}.{worksheet_rows})",
-                                "nativeQueryRef": f"Suma de {worksheet_rows}"
-                            }
-                        ]
-                    }
-                },
-                "sortDefinition": {
-                    "sort": [
-                        {
-                            "field": {
-                                "Column": {
-                                    "Expression": {
-                                        "SourceRef": {
-                                            "Entity": worksheet_relation
-                                        }
-                                    },
-                                    "Property": worksheet_cols
-                                }
-                            },
-                            "direction": "Ascending"
-                        }
-                    ],
-                    "isDefaultSort": True
-                }
-            },
-            "visualContainerObjects": {
-                "title": [
-                    {
-                        "properties": {
-                            "text": {
-                                "expr": {
-                                    "Literal": {
-                                        "Value": worksheet_title
-                                    }
-                                }
-                            }
-                        }
-                    }
-                ]
-            },
-            "drillFilterOtherVisuals": True
-        },
-        "filterConfig": {
-            "filters": [
-                {
-                    "name": generar_hex_metodo(),
-                    "field": {
-                        "Column": {
-                            "Expression": {
-                                "SourceRef": {
-                                    "Entity": worksheet_relation
-                                }
-                            },
-                            "Property": worksheet_cols
-                        }
-                    },
-                    "type": "Categorical"
-                },
-                {
-                    "name": generar_hex_metodo(),
-                    "field": {
-                        "Aggregation": {
-                            "Expression": {
-                                "Column": {
-                                    "Expression": {
-                                        "SourceRef": {
-                                            "Entity": worksheet_relation
-                                        }
-                                    },
-                                    "Property": worksheet_rows
-                                }
-                            },
-                            "Function": worksheet_derivation
-                        }
-                    },
-                    "type": "Advanced"
-                }
-            ]
-        }
-    }
-    return data
\ No newline at end of file
+
+def _field_property(field):
+    """
+    Propiedad (campo de Power BI) de una expresión Column, Measure o Aggregation(Column).
+    """
+    inner = next(iter(field.values()))
+    if "Property" in inner:
+        return inner["Property"]
+    return _field_property(inner["Expression"])
+
+
+def place_visual(data, name, position_X=None, position_Y=None, position_width=None, position_height=None,
+                 position_Z=None):
+    """
+    Devuelve una copia de un visual generado con otro name y otra posición, sin volver a generarlo.
+    Los IDs de los filtros se derivan del nuevo name igual que en los generate_json_*.
+    Solo se copian los diccionarios que cambian: el resto (query, títulos...) se comparte con data.
+    """
+    placed = dict(data, name=name)
+    if position_X is not None:
+        placed["position"] = dict(data["position"], x=position_X, y=position_Y, z=position_Z,
+                                  height=position_height, width=position_width)
+    if "filterConfig" in data:
+        filter_ids = IdRegistry()
+        filters = [
+            dict(visual_filter, name=filter_ids.new_id(name, "filter", _field_property(visual_filter["field"]),
+                                                       visual_filter["type"]))
+            for visual_filter in data["filterConfig"]["filters"]
+        ]
+        placed["filterConfig"] = dict(data["filterConfig"], filters=filters)
+    return placed
+
+
+class VisualCache:
+    """
+    Visuals ya generados de un workbook, por worksheet. Un worksheet que aparece en varios
+    dashboards se genera una sola vez (con su generador elegido una sola vez) y en las demás
+    páginas se reutiliza con place_visual, cambiando solo name, posición y tabOrder.
+    names (ver semantic_model.model_names) se pasa a los generadores.
+    Se puede usar desde varios hilos (PipelinedWriter).
+    """
+
+    def __init__(self, names=None):
+        self.names = names
+        self._generators = {}
+        self._visuals = {}
+        self._lock = threading.Lock()
+        self.generated = 0
+        self.reused = 0
+
+    def generator_for(self, key, worksheet):
+        """
+        Función generadora del worksheet (ver get_visual_generator_by_type), calculada una vez por key.
+        """
+        with self._lock:
+            generate_func = self._generators.get(key)
+        if generate_func is None:
+            generate_func = get_visual_generator_by_type(worksheet["type"], worksheet)
+            with self._lock:
+                generate_func = self._generators.setdefault(key, generate_func)
+        return generate_func
+
+    def render(self, key, generate_func, worksheet_data, name, position, tab_order=None):
+        """
+        Devuelve el visual del worksheet en la posición indicada (position: argumentos
+        position_X... de los generate_json_*, o {} para la posición por defecto del generador).
+        """
+        with self._lock:
+            cached = self._visuals.get(key)
+        # Sin posición se usan los valores por defecto de cada generador: solo se reutiliza
+        # un visual generado en las mismas condiciones
+        if cached is not None and cached[0] is generate_func and bool(cached[1]) == bool(position):
+            data = place_visual(cached[2], name, **position)
+            reused = True
+        else:
+            data = generate_func([worksheet_data], name, names=self.names, **position)
+            reused = False
+        if tab_order is not None:
+            data["position"] = dict(data["position"], tabOrder=tab_order)
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.generated += 1
+                self._visuals.setdefault(key, (generate_func, position, data))
+        return data
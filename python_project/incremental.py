@@ -0,0 +1,137 @@
+import os
+import json
+import hashlib
+
+import generators
+import utils
+import dax
+import layout
+import templates
+from records import json_default
+
+"""
+Conversión incremental: un manifiesto junto a report.json registra la huella de cada
+página y visual y los archivos que produjo. En la siguiente ejecución solo se regeneran
+las páginas y visuals cuya huella cambió, y se eliminan las salidas de hojas borradas.
+"""
+
+MANIFEST_FILE = "conversion_manifest.json"
+MANIFEST_VERSION = 1
+
+# Módulos cuyo código determina el contenido de los archivos generados
+_CONVERTER_MODULES = (generators, templates, utils, dax, layout)
+
+
+def converter_fingerprint():
+    """
+    Huella del código de los generadores: si cambia, todo el manifiesto queda invalidado.
+    """
+    digest = hashlib.sha256()
+    for module in _CONVERTER_MODULES:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def combine_fingerprint(*parts):
+    """
+    Combina varias partes (huellas, posiciones, nombres...) en una sola huella SHA-256.
+    """
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ConversionManifest:
+    """
+    Manifiesto de una conversión incremental.
+    Las entradas se indexan por una clave ("page:<id>" o "visual:<página>/<visual>") y guardan
+    la huella de origen y los archivos de salida relativos a la carpeta definition.
+    """
+
+    def __init__(self, output_path, previous=None, settings=None):
+        self.output_path = output_path
+        # Las opciones que cambian el contenido de los archivos (p. ej. JSON compacto) forman parte de la huella
+        self.converter = combine_fingerprint(converter_fingerprint(), settings or {})
+        previous = previous or {}
+        # Si cambió el código o el formato del manifiesto, nada de lo anterior es reutilizable
+        if previous.get("version") != MANIFEST_VERSION or previous.get("converter") != self.converter:
+            self._reusable = {}
+        else:
+            self._reusable = previous.get("entries", {})
+        self._previous = previous.get("entries", {})
+        self.entries = {}
+        self.regenerated = 0
+        self.reused = 0
+
+    @classmethod
+    def load(cls, output_path, settings=None):
+        """
+        Carga el manifiesto existente en output_path (o uno vacío si no hay o está corrupto).
+        """
+        path = os.path.join(output_path, MANIFEST_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = None
+        return cls(output_path, previous, settings)
+
+    def is_current(self, key, fingerprint):
+        """
+        Devuelve True si la entrada key tiene la misma huella que en la ejecución anterior
+        y todos sus archivos siguen en disco; en ese caso la registra como reutilizada.
+        """
+        entry = self._reusable.get(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return False
+        if not all(os.path.exists(os.path.join(self.output_path, f)) for f in entry["files"]):
+            return False
+        self.entries[key] = entry
+        self.reused += 1
+        return True
+
+    def record(self, key, fingerprint, files, **info):
+        """
+        Registra una entrada regenerada en esta ejecución.
+        """
+        entry = {"fingerprint": fingerprint, "files": [self._relative(f) for f in files]}
+        entry.update(info)
+        self.entries[key] = entry
+        self.regenerated += 1
+
+    def remove_stale(self):
+        """
+        Elimina los archivos de entradas anteriores que ya no existen (hojas o dashboards borrados)
+        y las carpetas que queden vacías. Devuelve la cantidad de archivos eliminados.
+        """
+        current_files = {f for entry in self.entries.values() for f in entry["files"]}
+        removed = 0
+        for entry in self._previous.values():
+            for relative in entry["files"]:
+                if relative in current_files:
+                    continue
+                path = os.path.join(self.output_path, relative)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+                self._remove_empty_parents(os.path.dirname(path))
+        return removed
+
+    def save(self):
+        path = os.path.join(self.output_path, MANIFEST_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "converter": self.converter,
+                "entries": dict(sorted(self.entries.items()))
+            }, f, ensure_ascii=False, indent=2)
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.output_path).replace(os.sep, "/")
+
+    def _remove_empty_parents(self, folder):
+        root = os.path.abspath(self.output_path)
+        folder = os.path.abspath(folder)
+        while folder != root and folder.startswith(root) and os.path.isdir(folder) and not os.listdir(folder):
+            os.rmdir(folder)
+            folder = os.path.dirname(folder)
@@ -0,0 +1,123 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from records import ZoneRecord
+
+"""
+Motor de layout de los dashboards: posiciones de los visuals en la página de Power BI.
+Las zonas de cada dashboard se guardan como columnas (x, y, ancho, alto) y se escalan todas
+juntas contra la extensión de ese mismo dashboard (no contra el máximo de todo el workbook),
+así cada página ocupa el lienzo completo aunque los dashboards tengan tamaños distintos.
+Con NumPy instalado el escalado es una operación vectorizada por columna; sin NumPy, o en
+dashboards con pocas zonas, se usa Python puro con el mismo resultado (cada valor escalado se
+trunca a entero).
+
+El orden z y el tabOrder se asignan en bloque según el orden de las zonas en el dashboard
+(las zonas posteriores quedan por encima, como en Tableau), en pasos de Z_ORDER_STEP como
+los numera Power BI Desktop.
+"""
+
+PAGE_WIDTH = 1280
+PAGE_HEIGHT = 720
+Z_ORDER_STEP = 1000
+# Por debajo de esta cantidad de zonas el costo de armar los arrays supera al del bucle
+NUMPY_MIN_ZONES = 512
+
+
+class DashboardLayout:
+    """
+    Posiciones escaladas de los worksheets de un dashboard.
+    Si un worksheet tiene varias zonas se usa la primera en el orden del dashboard; todas las
+    zonas cuentan para la extensión del dashboard.
+    """
+    __slots__ = ("names", "x", "y", "width", "height", "z", "_rows")
+
+    def __init__(self, worksheet_zones, page_width=PAGE_WIDTH, page_height=PAGE_HEIGHT, use_numpy=None):
+        zones = [_zone_tuple(zone) for zone in worksheet_zones]
+        # Índice de la primera zona de cada worksheet
+        first = {}
+        for index, zone in enumerate(zones):
+            first.setdefault(zone[0], index)
+        self.names = list(first)
+        self._rows = {name: row for row, name in enumerate(self.names)}
+        if use_numpy is None:
+            use_numpy = np is not None and len(zones) >= NUMPY_MIN_ZONES
+        scale = _scale_numpy if use_numpy else _scale_python
+        self.x, self.y, self.width, self.height = scale(zones, list(first.values()), page_width, page_height)
+        self.z = list(range(0, len(self.names) * Z_ORDER_STEP, Z_ORDER_STEP))
+
+    def __contains__(self, worksheet_name):
+        return worksheet_name in self._rows
+
+    def __len__(self):
+        return len(self.names)
+
+    def position(self, worksheet_name):
+        """
+        Argumentos de posición para los generate_json_* (position_X, ...), o {} si el worksheet
+        no tiene zona en el dashboard (el generador usa su posición por defecto).
+        """
+        row = self._rows.get(worksheet_name)
+        if row is None:
+            return {}
+        return {
+            "position_X": self.x[row],
+            "position_Y": self.y[row],
+            "position_width": self.width[row],
+            "position_height": self.height[row],
+            "position_Z": self.z[row]
+        }
+
+    def tab_order(self, worksheet_name):
+        """
+        Orden de tabulación del visual (el mismo orden que z), o None si no tiene zona.
+        """
+        row = self._rows.get(worksheet_name)
+        return None if row is None else self.z[row]
+
+
+def _zone_tuple(zone):
+    """
+    (worksheet, x, y, ancho, alto) de una zona (ZoneRecord o dict).
+    """
+    if isinstance(zone, ZoneRecord):
+        return zone.worksheet_name, zone.x, zone.y, zone.width, zone.height
+    return zone["worksheet_name"], zone["x"], zone["y"], zone["width"], zone["height"]
+
+
+def _scale_factors(max_width, max_height, page_width, page_height):
+    scale_x = page_width / max_width if max_width else 1
+    scale_y = page_height / max_height if max_height else 1
+    return scale_x, scale_y
+
+
+def _scale_python(zones, used, page_width, page_height):
+    # Extensión del dashboard: la zona que más se aleja del origen en cada eje
+    max_width = max((zone[1] + zone[3] for zone in zones), default=page_width)
+    max_height = max((zone[2] + zone[4] for zone in zones), default=page_height)
+    scale_x, scale_y = _scale_factors(max_width, max_height, page_width, page_height)
+    used = [zones[index] for index in used]
+    return (
+        [int(zone[1] * scale_x) for zone in used],
+        [int(zone[2] * scale_y) for zone in used],
+        [int(zone[3] * scale_x) for zone in used],
+        [int(zone[4] * scale_y) for zone in used]
+    )
+
+
+def _scale_numpy(zones, used, page_width, page_height):
+    # Matriz (zonas x 4) con x, y, ancho, alto: todas cuentan para la extensión
+    everything = np.fromiter((value for zone in zones for value in zone[1:]), dtype=np.float64,
+                             count=len(zones) * 4).reshape(-1, 4)
+    if len(everything):
+        max_width = (everything[:, 0] + everything[:, 2]).max()
+        max_height = (everything[:, 1] + everything[:, 3]).max()
+    else:
+        max_width, max_height = page_width, page_height
+    scale = np.array(_scale_factors(max_width, max_height, page_width, page_height))
+    used = everything[np.array(used, dtype=np.intp)]
+    # int() de Python trunca hacia cero, igual que astype sobre float64
+    scaled = (used * np.tile(scale, 2)).astype(np.int64)
+    return tuple(scaled[:, column].tolist() for column in range(4))
@@ -1,52 +1,266 @@
 import os
-import json
+import sys
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-from extractors import extract_datasource_and_dependencies, extract_dashboards_and_worksheets
-from generators import (
-    generate_json_column_graph, generate_json_bar_graph, generate_json_line_graph,
-    generate_json_pie, generate_json_table, get_visual_generator_by_type
+from extractors import (
+    parse_workbook, extract_datasource_and_dependencies, extract_dashboards_and_worksheets,
+    extract_workbook_streaming, save_extracted_data
 )
-from utils import generar_hex_metodo, normalize_name, scale_zone
+from parse_cache import ParseCache, load_or_extract
+from generators import VisualCache
+from incremental import ConversionManifest, combine_fingerprint
+from serialization import JsonSerializer, write_json, BACKENDS
+from archive import ARCHIVE_ROOT
+from writers import InlineWriter, PipelinedWriter, TreeWriter, ArchiveWriter
+from report_tree import ReportTree
+from semantic_model import build_semantic_model, model_names, write_semantic_model, semantic_model_path_for
+import tracing
+import xml_backend
+from layout import DashboardLayout
+from utils import IdRegistry, normalize_name, index_worksheets_by_name
 
 """
 Script principal para convertir dashboards de Tableau a la estructura de Power BI.
 Extrae dashboards y worksheets, genera la estructura de carpetas y archivos JSON.
+convert_workbook hace la misma conversión en memoria, para usarla desde otros programas.
 """
 
-# Ruta base del proyecto Tableau (donde está el .twb)
+# Ruta base del proyecto Tableau (donde está el .twb o .twbx)
 BASE_PATH = r"C:\Users\alejo\OneDrive\Desktop\tableau_to_powerbi\python_project"
 # Ruta base del proyecto Power BI (donde quieres los archivos generados) hasta la carpeta definition
 POWERBI_PROJECT_PATH = r"C:\Users\alejo\OneDrive\Desktop\prueba\prueba.Report\definition"
+# Extracción en streaming (iterparse): memoria acotada para workbooks muy grandes
+STREAMING_EXTRACTION = False
+# Generación y escritura de visuals en un pool de hilos (útil en unidades de red/OneDrive)
+PIPELINED_WRITES = False
+IO_THREADS = 8
+# Regenera solo lo que cambió desde la última conversión (manifiesto junto a report.json)
+INCREMENTAL = False
+# Carpeta de la caché de parseo por hash de contenido (None desactiva la caché)
+PARSE_CACHE_DIR = None
+# Formato JSON de salida: indentado (como Power BI Desktop) o compacto; backend "auto" usa orjson si está instalado
+COMPACT_JSON = False
+JSON_BACKEND = "auto"
+# Escribe cada reporte como un único .zip (árbol definition/ completo) en lugar de carpetas
+ARCHIVE_OUTPUT = False
+# Formato de las trazas por etapa (--trace): "chrome" (chrome://tracing, Perfetto) o "json"
+TRACE_FORMAT = "chrome"
+# Genera también el modelo semántico (<nombre>.SemanticModel en TMDL) junto al reporte
+SEMANTIC_MODEL_OUTPUT = False
 
-if __name__ == "__main__":
-    try:
-        # Ruta al archivo Tableau
-        twb_path = os.path.join(BASE_PATH, "TableauPrueba 3.twb")
-        
-        # Validación de existencia del archivo
-        if not os.path.exists(twb_path):
-            raise FileNotFoundError(f"No se encontró el archivo Tableau en: {twb_path}")
-        
-        # Extraer dashboards y worksheets
-        dashboards = extract_dashboards_and_worksheets(twb_path)
-        extracted_data = extract_datasource_and_dependencies(twb_path)
-        dashboard_hex_list = []
-
-        # --- Cálculo de máximos para escalado ---
-        all_zones = [zone for dashboard in dashboards for zone in dashboard["worksheet_zones"]]
-        max_width = max((z["x"] + z["width"]) for z in all_zones) if all_zones else 1280
-        max_height = max((z["y"] + z["height"]) for z in all_zones) if all_zones else 720
-
-        # Procesar cada dashboard y generar carpetas y archivos de página y visuals
-        pages_folder = os.path.join(POWERBI_PROJECT_PATH, "pages")  
-        os.makedirs(pages_folder, exist_ok=True)
-
-        for dashboard in dashboards:
+
+def _generate_and_write_visual(visual_cache, worksheet_key, generate_func, worksheet_data, worksheet_hex, position,
+                               visual_json_path, writer, tab_order=None, dashboard_name=""):
+    """
+    Genera el visual de un worksheet (o reutiliza el ya generado en otra página, ver
+    generators.VisualCache) y lo guarda en visual.json.
+    tab_order (ver layout.DashboardLayout) reemplaza el tabOrder por defecto del generador.
+    dashboard_name se registra en los spans, para agrupar por dashboard los bytes escritos.
+    """
+    worksheet = worksheet_data["worksheet"]
+    with tracing.span("generate_visual", "visual", worksheet=worksheet["worksheet_name"], type=worksheet["type"],
+                      dashboard=dashboard_name):
+        data = visual_cache.render(worksheet_key, generate_func, worksheet_data, worksheet_hex, position, tab_order)
+    with tracing.span("write_visual", "write", worksheet=worksheet["worksheet_name"], dashboard=dashboard_name):
+        writer.store_json(visual_json_path, data)
+
+
+def _write_page(writer, page_json_path, page_json, dashboard_name):
+    """
+    Guarda page.json dentro de un span con el nombre del dashboard (ver tracing.add).
+    """
+    with tracing.span("write_page", "write", dashboard=dashboard_name):
+        writer.store_json(page_json_path, page_json)
+
+
+def convert_workbook_to_folder(twb_path, output_path, streaming=STREAMING_EXTRACTION, save_extracted_json=True,
+                               pipelined=PIPELINED_WRITES, io_threads=IO_THREADS, incremental=INCREMENTAL,
+                               cache_dir=None, compact_json=COMPACT_JSON, json_backend=JSON_BACKEND,
+                               archive=ARCHIVE_OUTPUT, trace_path=None, trace_format=TRACE_FORMAT,
+                               semantic_model=SEMANTIC_MODEL_OUTPUT, strict=False):
+    """
+    Convierte un workbook Tableau (.twb o .twbx) a la carpeta definition de un reporte Power BI.
+    Si pipelined es True, la generación de visuals y la escritura de archivos se ejecutan
+    en un pool de io_threads hilos con cola acotada; el resultado en disco es el mismo.
+    Si incremental es True, solo se regeneran las páginas y visuals cuya huella cambió
+    respecto del manifiesto de la ejecución anterior (ver incremental.py).
+    Si se indica cache_dir, el modelo extraído se lee/guarda en la caché de parseo (ver parse_cache.py).
+    compact_json y json_backend eligen el formato y el serializador JSON (ver serialization.py).
+    Si archive es True, output_path es un archivo .zip y todo el árbol definition/ se escribe
+    en él de una sola vez, sin crear carpetas (ver archive.py).
+    Si se indica trace_path, se guardan ahí las trazas por etapa de la conversión (ver tracing.py)
+    y el resumen incluye los totales por etapa en "trace".
+    Si semantic_model es True, también se escribe el modelo semántico en TMDL junto al reporte
+    (ver semantic_model.py) y el resumen incluye su ruta en "semantic_model".
+    Si strict es True, un XML inválido lanza xml_backend.ParseError antes de escribir nada
+    (sin strict se informa y se genera un reporte vacío).
+    Devuelve un resumen con la cantidad de páginas y visuals generados.
+    """
+    with tracing.tracing(enabled=trace_path is not None) as tracer:
+        with tracing.span("convert", workbook=os.path.basename(twb_path)):
+            result = _convert_workbook_to_folder(
+                twb_path, output_path, streaming, save_extracted_json, pipelined, io_threads, incremental,
+                cache_dir, compact_json, json_backend, archive, semantic_model, strict
+            )
+    if tracer is not None:
+        tracer.write(trace_path, trace_format)
+        result["trace"] = tracer.summary()
+    return result
+
+
+def _convert_workbook_to_folder(twb_path, output_path, streaming, save_extracted_json, pipelined, io_threads,
+                                incremental, cache_dir, compact_json, json_backend, archive, semantic_model, strict):
+    # Validación de existencia del archivo
+    if not os.path.exists(twb_path):
+        raise FileNotFoundError(f"No se encontró el archivo Tableau en: {twb_path}")
+    if archive and incremental:
+        raise ValueError("El modo incremental requiere la salida en carpetas (no es compatible con archive)")
+    
+    # Parsear el workbook una sola vez y extraer dashboards y worksheets
+    fingerprints = {"worksheets": {}, "dashboards": {}}
+    with tracing.span("extract") as extract_span:
+        if cache_dir:
+            try:
+                dashboards, extracted_data, fingerprints = load_or_extract(twb_path, ParseCache(cache_dir), streaming)
+            except xml_backend.ParseError as e:
+                if strict:
+                    raise
+                print(f"Error al procesar el archivo XML: {e}")
+                dashboards, extracted_data = [], []
+            if save_extracted_json:
+                save_extracted_data(extracted_data, serializer=JsonSerializer(backend=json_backend))
+        elif streaming:
+            dashboards, extracted_data = extract_workbook_streaming(twb_path, fingerprints if incremental else None, strict)
+        else:
+            workbook = parse_workbook(twb_path, strict)
+            dashboards = extract_dashboards_and_worksheets(workbook)
+            extracted_data = extract_datasource_and_dependencies(workbook, save_json=save_extracted_json)
+            if incremental:
+                fingerprints = workbook.fingerprints
+        extract_span.set(dashboards=len(dashboards), worksheets=len(extracted_data))
+    manifest = ConversionManifest.load(output_path, {"compact_json": compact_json}) if incremental else None
+    workbook_key = _workbook_key(twb_path)
+    # Nombres de tablas y campos calculados compartidos por los visuals y el modelo semántico
+    names = model_names(extracted_data)
+
+    serializer = JsonSerializer(compact=compact_json, backend=json_backend)
+    if archive:
+        # Las rutas se arman sobre una raíz virtual; nada se escribe en disco hasta cerrar el zip
+        definition_path = ARCHIVE_ROOT
+        writer = ArchiveWriter(output_path, root=definition_path, serializer=serializer)
+    else:
+        definition_path = output_path
+        if pipelined:
+            writer = PipelinedWriter(max_workers=io_threads, serializer=serializer)
+        else:
+            writer = InlineWriter(serializer)
+    with writer:
+        dashboard_hex_list, visual_count = _build_report(
+            dashboards, extracted_data, workbook_key, definition_path, writer, manifest, fingerprints, names
+        )
+
+    result = {
+        "workbook": twb_path,
+        "output_path": output_path,
+        "dashboards": len(dashboard_hex_list),
+        "visuals": visual_count
+    }
+    if semantic_model:
+        with tracing.span("semantic_model"):
+            tables = build_semantic_model(extracted_data, names=names)
+            result["semantic_model"] = semantic_model_path_for(output_path)
+            write_semantic_model(tables, result["semantic_model"])
+        result["tables"] = len(tables)
+    if manifest is not None:
+        result["removed_files"] = manifest.remove_stale()
+        manifest.save()
+        result["regenerated"] = manifest.regenerated
+        result["reused"] = manifest.reused
+        print(f"Incremental: {manifest.regenerated} páginas/visuals regenerados, {manifest.reused} sin cambios, "
+              f"{result['removed_files']} archivos eliminados")
+    return result
+
+
+def convert_workbook(source, name=None, streaming=False, compact_json=False, json_backend=JSON_BACKEND):
+    """
+    Convierte un workbook Tableau (.twb o .twbx) a un ReportTree en memoria.
+    source puede ser una ruta, el contenido en bytes o un archivo binario abierto.
+    No crea carpetas ni archivos (tampoco extracted_data_dependencies.json); el árbol
+    se serializa a pedido con ReportTree.dumps, write_folder o write_archive.
+    name fija la clave de los IDs de páginas y visuals (por defecto, el nombre del archivo).
+    """
+    if streaming:
+        dashboards, extracted_data = extract_workbook_streaming(source)
+    else:
+        workbook = parse_workbook(source)
+        dashboards = extract_dashboards_and_worksheets(workbook)
+        extracted_data = extract_datasource_and_dependencies(workbook, save_json=False)
+
+    tree = ReportTree(JsonSerializer(compact=compact_json, backend=json_backend))
+    with TreeWriter(tree, root=ARCHIVE_ROOT) as writer:
+        _build_report(dashboards, extracted_data, name or _workbook_key(source), ARCHIVE_ROOT, writer,
+                      names=model_names(extracted_data))
+    return tree
+
+
+def _workbook_key(source):
+    """
+    Clave estable del workbook para los IDs: el nombre del archivo sin extensión.
+    """
+    path = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", None)
+    if not isinstance(path, (str, os.PathLike)):
+        return "workbook"
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _build_report(dashboards, extracted_data, workbook_key, definition_path, writer, manifest=None, fingerprints=None,
+                  names=None):
+    """
+    Genera todas las páginas, visuals y metadatos del reporte con writer.
+    names (ver semantic_model.model_names) fija las tablas y campos calculados de los visuals.
+    Devuelve (lista de IDs de página, cantidad de visuals).
+    """
+    dashboard_hex_list = []
+    # Índice de worksheets por nombre normalizado (búsquedas O(1) al armar las páginas)
+    worksheets_by_name = index_worksheets_by_name(extracted_data)
+
+    # IDs deterministas: la misma entrada produce siempre el mismo árbol de salida
+    ids = IdRegistry()
+
+    # Procesar cada dashboard y generar carpetas y archivos de página y visuals
+    pages_folder = os.path.join(definition_path, "pages")
+    writer.makedirs(pages_folder)
+    visual_count = _write_pages(
+        dashboards, worksheets_by_name, pages_folder, dashboard_hex_list, writer, workbook_key, ids, manifest,
+        fingerprints, VisualCache(names)
+    )
+    with tracing.span("write_metadata", "write"):
+        _write_report_metadata(definition_path, pages_folder, dashboard_hex_list, writer)
+    return dashboard_hex_list, visual_count
+
+
+def _write_pages(dashboards, worksheets_by_name, pages_folder, dashboard_hex_list, writer, workbook_key, ids,
+                 manifest=None, fingerprints=None, visual_cache=None):
+    """
+    Genera y escribe page.json y los visual.json de cada dashboard. Devuelve la cantidad de visuals.
+    Las posiciones se escalan por dashboard con layout.DashboardLayout; los worksheets que
+    aparecen en varios dashboards se generan una vez (visual_cache, ver generators.VisualCache).
+    Con manifest, se omiten las páginas y visuals cuya huella no cambió.
+    """
+    visual_count = 0
+    visual_cache = visual_cache or VisualCache()
+    # Los nombres del modelo dependen de todo el workbook: forman parte de la huella de cada visual
+    names_fingerprint = combine_fingerprint(visual_cache.names) if manifest is not None else ""
+    for dashboard in dashboards:
+        with tracing.span("dashboard", "dashboard", dashboard=dashboard["dashboard_name"]) as dashboard_span:
+            visuals_before = visual_count
             print(f"Dashboard: {dashboard['dashboard_name']} - Worksheets asociados: {dashboard['worksheet_names']}")
-            dashboard_hex = generar_hex_metodo()
+            dashboard_hex = ids.new_id(workbook_key, "page", dashboard["dashboard_name"])
             dashboard_hex_list.append(dashboard_hex)
             page_folder = os.path.join(pages_folder, dashboard_hex)
-            os.makedirs(page_folder, exist_ok=True)
+            writer.makedirs(page_folder)
             page_json = {
                 "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/page/1.4.0/schema.json",
                 "name": dashboard_hex,
@@ -55,108 +269,265 @@ if __name__ == "__main__":
                 "height": 720,
                 "width": 1280
             }
-            with open(os.path.join(page_folder, "page.json"), "w", encoding="utf-8") as f:
-                json.dump(page_json, f, ensure_ascii=False, indent=2)
+            page_json_path = os.path.join(page_folder, "page.json")
+            if manifest is None:
+                writer.submit(_write_page, writer, page_json_path, page_json, dashboard["dashboard_name"])
+            else:
+                dashboard_fingerprint = fingerprints["dashboards"].get(dashboard["dashboard_name"], "")
+                page_fingerprint = combine_fingerprint(dashboard_fingerprint, page_json)
+                page_key = f"page:{dashboard_hex}"
+                if not manifest.is_current(page_key, page_fingerprint):
+                    writer.submit(_write_page, writer, page_json_path, page_json, dashboard["dashboard_name"])
+                    manifest.record(page_key, page_fingerprint, [page_json_path],
+                                    dashboard=dashboard["dashboard_name"], source=dashboard_fingerprint)
 
             visuals_folder = os.path.join(page_folder, "visuals")
-            os.makedirs(visuals_folder, exist_ok=True)
+            writer.makedirs(visuals_folder)
             visuals_creados = set()
+            with tracing.span("layout", zones=len(dashboard["worksheet_zones"])):
+                layout = DashboardLayout(dashboard["worksheet_zones"])
             for worksheet_name in dashboard["worksheet_names"]:
                 normalized_name = normalize_name(worksheet_name)
                 if normalized_name in visuals_creados:
                     continue
-                worksheet_data = next(
-                    (ws for ws in extracted_data if normalize_name(ws["worksheet"]["worksheet_name"]) == normalized_name),
-                    None
-                )
+                worksheet_data = worksheets_by_name.get(normalized_name)
                 if worksheet_data:
-                    worksheet_hex = generar_hex_metodo()
+                    worksheet_hex = ids.new_id(workbook_key, "visual", dashboard["dashboard_name"], worksheet_name)
                     visual_subfolder = os.path.join(visuals_folder, worksheet_hex)
                     visual_json_path = os.path.join(visual_subfolder, "visual.json")
-                    if not os.path.exists(visual_json_path):
-                        os.makedirs(visual_subfolder, exist_ok=True)
-                        worksheet_type = worksheet_data["worksheet"]["type"]
-                        print(f"Generando visual para: {worksheet_name} ({worksheet_type})")
-                        generate_func = get_visual_generator_by_type(worksheet_type, worksheet_data["worksheet"])
-                        zone = next(
-                            (z for z in dashboard["worksheet_zones"] if z["worksheet_name"] == worksheet_name),
-                            None
-                        )
-                        if zone:
-                            scaled = scale_zone(zone, max_width, max_height)
-                            data = generate_func(
-                                [worksheet_data], worksheet_hex,
-                                position_X=scaled["x"],
-                                position_Y=scaled["y"],
-                                position_width=scaled["width"],
-                                position_height=scaled["height"],
-                                position_Z=2
-                            )
-                        else:
-                            data = generate_func([worksheet_data], worksheet_hex)
-                        with open(visual_json_path, "w", encoding="utf-8") as f:
-                            json.dump(data, f, ensure_ascii=False, indent=2)
+                    position = layout.position(worksheet_name)
+                    tab_order = layout.tab_order(worksheet_name)
+                    visual_count += 1
                     visuals_creados.add(normalized_name)
+                    if manifest is not None:
+                        worksheet_fingerprint = fingerprints["worksheets"].get(worksheet_data["worksheet"]["worksheet_name"], "")
+                        visual_fingerprint = combine_fingerprint(
+                            worksheet_fingerprint, worksheet_data, position, tab_order, names_fingerprint
+                        )
+                        visual_key = f"visual:{dashboard_hex}/{worksheet_hex}"
+                        if manifest.is_current(visual_key, visual_fingerprint):
+                            print(f"Visual sin cambios: {worksheet_name}")
+                            continue
+                        manifest.record(visual_key, visual_fingerprint, [visual_json_path],
+                                        dashboard=dashboard["dashboard_name"], worksheet=worksheet_name,
+                                        source=worksheet_fingerprint)
+                    worksheet_type = worksheet_data["worksheet"]["type"]
+                    print(f"Generando visual para: {worksheet_name} ({worksheet_type})")
+                    generate_func = visual_cache.generator_for(normalized_name, worksheet_data["worksheet"])
+                    writer.submit(
+                        _generate_and_write_visual, visual_cache, normalized_name, generate_func, worksheet_data,
+                        worksheet_hex, position, visual_json_path, writer, tab_order, dashboard["dashboard_name"]
+                    )
+            dashboard_span.set(worksheets=len(dashboard["worksheet_names"]), visuals=visual_count - visuals_before)
+    return visual_count
 
-        # Crear pages.json con la lista de páginas y la página activa
-        pages_json = {
-            "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/pagesMetadata/1.0.0/schema.json",
-            "pageOrder": dashboard_hex_list,
-            "activePageName": dashboard_hex_list[0] if dashboard_hex_list else ""
-        }
-        pages_json_path = os.path.join(pages_folder, "pages.json") 
-        with open(pages_json_path, "w", encoding="utf-8") as f:
-            json.dump(pages_json, f, ensure_ascii=False, indent=2)
-
-        # Crear report.json con la estructura extendida por defecto de Power BI Desktop
-        report_json = {
-            "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/report/1.3.0/schema.json",
-            "themeCollection": {
-                "baseTheme": {
-                    "name": "CY24SU10",
-                    "reportVersionAtImport": "5.64",
-                    "type": "SharedResources"
-                }
-            },
-            "layoutOptimization": "None",
-            "objects": {
-                "section": [
-                    {
-                        "properties": {
-                            "verticalAlignment": {
-                                "expr": {
-                                    "Literal": {
-                                        "Value": "'Top'"
-                                    }
+
+def _write_report_metadata(output_path, pages_folder, dashboard_hex_list, writer):
+    """
+    Escribe pages.json y report.json.
+    """
+    # Crear pages.json con la lista de páginas y la página activa
+    pages_json = {
+        "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/pagesMetadata/1.0.0/schema.json",
+        "pageOrder": dashboard_hex_list,
+        "activePageName": dashboard_hex_list[0] if dashboard_hex_list else ""
+    }
+    pages_json_path = os.path.join(pages_folder, "pages.json") 
+    writer.write_json(pages_json_path, pages_json)
+
+    # Crear report.json con la estructura extendida por defecto de Power BI Desktop
+    report_json = {
+        "$schema": "https://developer.microsoft.com/json-schemas/fabric/item/report/definition/report/1.3.0/schema.json",
+        "themeCollection": {
+            "baseTheme": {
+                "name": "CY24SU10",
+                "reportVersionAtImport": "5.64",
+                "type": "SharedResources"
+            }
+        },
+        "layoutOptimization": "None",
+        "objects": {
+            "section": [
+                {
+                    "properties": {
+                        "verticalAlignment": {
+                            "expr": {
+                                "Literal": {
+                                    "Value": "'Top'"
                                 }
                             }
                         }
                     }
-                ]
-            },
-            "resourcePackages": [
-                {
-                    "name": "SharedResources",
-                    "type": "SharedResources",
-                    "items": [
-                        {
-                            "name": "CY24SU10",
-                            "path": "BaseThemes/CY24SU10.json",
-                            "type": "BaseTheme"
-                        }
-                    ]
                 }
-            ],
-            "settings": {
-                "useStylableVisualContainerHeader": True,
-                "defaultDrillFilterOtherVisuals": True,
-                "allowChangeFilterTypes": True,
-                "useDefaultAggregateDisplayName": True
+            ]
+        },
+        "resourcePackages": [
+            {
+                "name": "SharedResources",
+                "type": "SharedResources",
+                "items": [
+                    {
+                        "name": "CY24SU10",
+                        "path": "BaseThemes/CY24SU10.json",
+                        "type": "BaseTheme"
+                    }
+                ]
             }
+        ],
+        "settings": {
+            "useStylableVisualContainerHeader": True,
+            "defaultDrillFilterOtherVisuals": True,
+            "allowChangeFilterTypes": True,
+            "useDefaultAggregateDisplayName": True
         }
-        report_json_path = os.path.join(POWERBI_PROJECT_PATH, "report.json") 
-        with open(report_json_path, "w", encoding="utf-8") as f:
-            json.dump(report_json, f, ensure_ascii=False, indent=2)
-    
+    }
+    report_json_path = os.path.join(output_path, "report.json") 
+    writer.write_json(report_json_path, report_json)
+
+
+def trace_path_for(output_path):
+    """
+    Ruta de la traza de una conversión: <nombre>.Report.trace.json junto a la salida
+    (la carpeta <nombre>.Report/definition o el archivo <nombre>.Report.zip).
+    """
+    output_path = os.path.normpath(output_path)
+    if output_path.lower().endswith(".zip"):
+        base = output_path[:-len(".zip")]
+    elif os.path.basename(output_path) == "definition":
+        base = os.path.dirname(output_path)
+    else:
+        base = output_path
+    return base + ".trace.json"
+
+
+def find_workbooks(source):
+    """
+    Devuelve la lista ordenada de archivos .twb/.twbx de un directorio o patrón glob.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    return sorted(p for p in paths if p.lower().endswith((".twb", ".twbx")) and os.path.isfile(p))
+
+
+def convert_job(twb_path, output_path, **options):
+    """
+    Convierte un workbook como un job de batch o del servicio (server.py): sin guardar
+    extracted_data_dependencies.json y sin lanzar excepciones. Un XML inválido cuenta como
+    error (strict) y no genera salida. Devuelve el resumen de convert_workbook_to_folder con
+    "error" en None, o el mensaje del error si falló.
+    """
+    try:
+        result = convert_workbook_to_folder(twb_path, output_path, save_extracted_json=False, strict=True, **options)
+        result["error"] = None
     except Exception as e:
-        print(f"Ocurrió un error: {e}")
\ No newline at end of file
+        result = {"workbook": twb_path, "output_path": output_path, "dashboards": 0, "visuals": 0, "error": str(e)}
+    return result
+
+
+def convert_batch(source, output_root, workers=None, **options):
+    """
+    Convierte en paralelo (ProcessPoolExecutor) todos los workbooks de un directorio o glob.
+    Cada workbook se escribe en su propio <output_root>/<nombre>.Report/definition
+    (o <output_root>/<nombre>.Report.zip con la opción archive).
+    options se pasa tal cual a convert_workbook_to_folder (streaming, pipelined, ...), salvo
+    trace=True, que guarda la traza de cada workbook junto a su salida y agrega en el resumen
+    los totales por etapa de todo el batch.
+    Devuelve un resumen agregado y lo guarda en <output_root>/batch_summary.json.
+    """
+    trace = options.pop("trace", False)
+    jobs = []
+    used_names = set()
+    for twb_path in find_workbooks(source):
+        report_name = os.path.splitext(os.path.basename(twb_path))[0]
+        # Evita que dos workbooks con el mismo nombre compartan la carpeta de salida
+        unique_name, suffix = report_name, 2
+        while unique_name.lower() in used_names:
+            unique_name, suffix = f"{report_name}_{suffix}", suffix + 1
+        used_names.add(unique_name.lower())
+        if options.get("archive"):
+            output_path = os.path.join(output_root, f"{unique_name}.Report.zip")
+        else:
+            output_path = os.path.join(output_root, f"{unique_name}.Report", "definition")
+        job_options = dict(options, trace_path=trace_path_for(output_path)) if trace else options
+        jobs.append((twb_path, output_path, job_options))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(convert_job, twb_path, output_path, **job_options)
+                   for twb_path, output_path, job_options in jobs]
+        results = [future.result() for future in futures]
+
+    summary = {
+        "workbooks": len(results),
+        "succeeded": sum(1 for r in results if r["error"] is None),
+        "failed": sum(1 for r in results if r["error"] is not None),
+        "dashboards": sum(r["dashboards"] for r in results),
+        "visuals": sum(r["visuals"] for r in results),
+        "results": results
+    }
+    if trace:
+        summary["trace"] = tracing.merge_summaries(r["trace"] for r in results if "trace" in r)
+    write_json(os.path.join(output_root, "batch_summary.json"), summary, make_dirs=True)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte workbooks de Tableau a reportes Power BI (PBIR).")
+    parser.add_argument("--batch", help="Directorio o patrón glob de archivos .twb/.twbx a convertir en paralelo")
+    parser.add_argument("--output", help="Carpeta raíz de salida para el modo batch")
+    parser.add_argument("--workers", type=int, default=None, help="Cantidad de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--streaming", action="store_true", default=STREAMING_EXTRACTION, help="Usa la extracción en streaming")
+    parser.add_argument("--pipelined", action="store_true", default=PIPELINED_WRITES,
+                        help="Genera y escribe los visuals en un pool de hilos")
+    parser.add_argument("--io-threads", type=int, default=IO_THREADS, help="Hilos de escritura del modo --pipelined")
+    parser.add_argument("--incremental", action="store_true", default=INCREMENTAL,
+                        help="Regenera solo las páginas y visuals que cambiaron desde la última conversión")
+    parser.add_argument("--cache-dir", default=PARSE_CACHE_DIR,
+                        help="Carpeta de la caché de parseo (el modelo extraído se reutiliza si el workbook no cambió)")
+    parser.add_argument("--compact-json", action="store_true", default=COMPACT_JSON,
+                        help="Escribe JSON compacto (sin indentación) para pipelines automáticos")
+    parser.add_argument("--json-backend", choices=BACKENDS, default=JSON_BACKEND, help="Serializador JSON")
+    parser.add_argument("--archive", action="store_true", default=ARCHIVE_OUTPUT,
+                        help="Escribe cada reporte como un único .zip (ver 'python archive.py explode')")
+    parser.add_argument("--trace", action="store_true",
+                        help="Guarda las trazas por etapa en <nombre>.Report.trace.json junto a cada salida")
+    parser.add_argument("--trace-format", choices=tracing.TRACE_FORMATS, default=TRACE_FORMAT,
+                        help="Formato de las trazas")
+    parser.add_argument("--semantic-model", action="store_true", default=SEMANTIC_MODEL_OUTPUT,
+                        help="Genera también <nombre>.SemanticModel (TMDL) con las tablas y medidas de los datasources")
+    args = parser.parse_args(argv)
+    options = {
+        "streaming": args.streaming, "pipelined": args.pipelined, "io_threads": args.io_threads,
+        "incremental": args.incremental, "cache_dir": args.cache_dir,
+        "compact_json": args.compact_json, "json_backend": args.json_backend, "archive": args.archive,
+        "trace_format": args.trace_format, "semantic_model": args.semantic_model
+    }
+
+    if args.batch:
+        if not args.output:
+            parser.error("--output es obligatorio en modo batch")
+        summary = convert_batch(args.batch, args.output, workers=args.workers, trace=args.trace, **options)
+        print(f"Batch: {summary['succeeded']}/{summary['workbooks']} workbooks convertidos, "
+              f"{summary['dashboards']} páginas, {summary['visuals']} visuals, {summary['failed']} con error")
+        for result in summary["results"]:
+            if result["error"]:
+                print(f"  Error en {result['workbook']}: {result['error']}")
+        return 1 if summary["failed"] else 0
+
+    try:
+        # Ruta al archivo Tableau (.twb o paquete .twbx)
+        twb_path = os.path.join(BASE_PATH, "TableauPrueba 3.twb")
+        output_path = POWERBI_PROJECT_PATH
+        if args.archive:
+            # .../<nombre>.Report/definition -> .../<nombre>.Report.zip
+            output_path = os.path.dirname(os.path.normpath(POWERBI_PROJECT_PATH)) + ".zip"
+        trace_path = trace_path_for(output_path) if args.trace else None
+        convert_workbook_to_folder(twb_path, output_path, trace_path=trace_path, **options)
+    except Exception as e:
+        print(f"Ocurrió un error: {e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
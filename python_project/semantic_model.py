@@ -0,0 +1,294 @@
+import os
+import re
+import json
+
+import tracing
+from archive import write_archive
+from dax import DEFAULT_CACHE, translate_calculations, calculation_name
+from records import TableRecord, ModelColumnRecord
+from utils import normalize_field, field_index_for
+
+"""
+Modelo semántico de Power BI (carpeta <nombre>.SemanticModel en formato TMDL) a partir de los
+datasources y dependencias extraídos de los worksheets.
+Cada worksheet repite las columnas que usa de su datasource; build_semantic_model las une en una
+tabla por datasource con las columnas sin repetir (por nombre normalizado, gana la primera, igual
+que el índice de campos de utils.build_field_index). El recorrido es lineal en la cantidad de
+worksheets: cada columna se resuelve con búsquedas en diccionarios, sin comparar worksheets entre sí.
+
+Los campos calculados se traducen a DAX (ver dax.py) una sola vez por tabla, después de unir
+todos los worksheets: las medidas quedan como "measure" y los cálculos de nivel de fila como
+columnas calculadas. Los que no tienen traducción se informan y se omiten.
+
+Archivos generados (rutas relativas a la carpeta <nombre>.SemanticModel):
+    definition.pbism
+    definition/database.tmdl
+    definition/model.tmdl
+    definition/tables/<tabla>.tmdl
+Power BI no distingue mayúsculas en los nombres: si dos datasources tienen el mismo caption, o un
+campo calculado se llama igual que una columna de su tabla, el repetido recibe un sufijo " (2)",
+" (3)"... y se informa con un aviso. Esos nombres se calculan una vez por workbook (model_names)
+y se usan tanto en el modelo como en los visuals del reporte.
+La partición de cada tabla es una tabla M vacía con las columnas del modelo, para reemplazar por
+la conexión real; el definition.pbir del reporte debe apuntar a esta carpeta (datasetReference.byPath).
+"""
+
+# Datasource de parámetros de Tableau: no es una tabla
+_SKIPPED_DATASOURCES = {"Parameters"}
+
+# Tipos de dato de Tableau -> (dataType de TMDL, tipo de columna en M)
+DATA_TYPES = {
+    "string": ("string", "text"),
+    "integer": ("int64", "Int64.Type"),
+    "real": ("double", "number"),
+    "date": ("dateTime", "date"),
+    "datetime": ("dateTime", "datetime"),
+    "boolean": ("boolean", "logical"),
+}
+DEFAULT_DATA_TYPE = DATA_TYPES["string"]
+
+COMPATIBILITY_LEVEL = 1567
+MODEL_CULTURE = "es-ES"
+
+_TMDL_PLAIN_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def model_names(extracted_data):
+    """
+    Nombres únicos del modelo de un workbook, calculados una vez y compartidos por el modelo
+    (build_semantic_model) y los visuals del reporte (generators), para que los visuals
+    referencien exactamente las tablas y campos calculados que define el modelo.
+    Devuelve {"tables": {datasource: tabla}, "calculations": {datasource: {campo normalizado: nombre}}}.
+    """
+    return _model_names(_collect_tables(extracted_data))
+
+
+def build_semantic_model(extracted_data, cache=None, names=None):
+    """
+    Une los bloques de dependencias de todos los worksheets en una tabla por datasource.
+    Devuelve la lista de TableRecord (name, datasource, relation_name, columns, measures), en el
+    orden en que aparece cada datasource. names (ver model_names) se calcula si no se indica.
+    """
+    tables = _collect_tables(extracted_data)
+    names = names or _model_names(tables)
+    with tracing.span("translate_calculations", tables=len(tables)):
+        return [_table_record(datasource_name, table, names, cache) for datasource_name, table in tables.items()]
+
+
+def _collect_tables(extracted_data):
+    tables = {}
+    for worksheet_data in extracted_data:
+        worksheet = worksheet_data["worksheet"]
+        field_index = field_index_for(worksheet)
+        datasources = {datasource.get("name", ""): datasource for datasource in worksheet.get("worksheet_datasources", [])}
+        for dependency in worksheet.get("dependency_info", []):
+            datasource_name = dependency.get("datasource", "")
+            if datasource_name in _SKIPPED_DATASOURCES:
+                continue
+            table = tables.get(datasource_name)
+            if table is None:
+                datasource = datasources.get(datasource_name, {})
+                table = tables[datasource_name] = {
+                    "name": datasource.get("caption") or datasource_name,
+                    "relation_name": datasource.get("relation_name") or "",
+                    "columns": {},
+                    "calculations": {},
+                    "datatypes": {}
+                }
+            for column in dependency.get("columns", []):
+                key = normalize_field(column.get("name", ""))
+                if not key or key.startswith(":"):
+                    continue
+                if key in table["datatypes"]:
+                    continue
+                field = field_index.get(key)
+                table["datatypes"][key] = field["datatype"] if field is not None else ""
+                if column.get("calculation_formula"):
+                    table["calculations"][key] = column
+                else:
+                    table["columns"][key] = column
+    return tables
+
+
+def _model_names(tables):
+    names = {"tables": {}, "calculations": {}}
+    table_names = set()
+    for datasource_name, table in tables.items():
+        table_name = names["tables"][datasource_name] = _unique_name(table["name"], table_names, "tablas", _table_key)
+        # Las medidas y columnas calculadas comparten espacio de nombres con las columnas de la tabla
+        column_names = {column.get("name", "").strip("[]").lower() for column in table["columns"].values()}
+        names["calculations"][datasource_name] = {
+            key: _unique_name(calculation_name(column), column_names, f"tabla {table_name}")
+            for key, column in table["calculations"].items()
+        }
+    return names
+
+
+def _table_record(datasource_name, table, names, cache):
+    table_name = names["tables"][datasource_name]
+    columns = []
+    for key, column in table["columns"].items():
+        name = column.get("name", "").strip("[]")
+        columns.append(_model_column(name, table["datatypes"][key], column.get("role", ""), source_column=name))
+
+    measures = []
+    translations = translate_calculations(list(table["calculations"].values()), table_name, cache or DEFAULT_CACHE,
+                                          table["datatypes"], names["calculations"][datasource_name])
+    for key, calculation in translations.items():
+        if calculation.error:
+            print(f"Campo calculado sin traducción a DAX ({table_name}.{calculation.name}): {calculation.error}")
+        elif calculation.kind == "measure":
+            measures.append(calculation)
+        else:
+            column = table["calculations"][key]
+            columns.append(_model_column(calculation.name, table["datatypes"][key], column.get("role", ""),
+                                         expression=calculation.expression))
+    return TableRecord(name=table_name, datasource=datasource_name, relation_name=table["relation_name"],
+                       columns=columns, measures=measures)
+
+
+def _unique_name(name, taken, label, key=str.lower):
+    """
+    Devuelve name o, si key(name) ya está en taken, name con un sufijo " (2)", " (3)"...
+    La clave del nombre elegido se agrega a taken.
+    """
+    unique = name
+    suffix = 2
+    while key(unique) in taken:
+        unique = f"{name} ({suffix})"
+        suffix += 1
+    if unique != name:
+        print(f"Nombre repetido en el modelo semántico ({label}): {name} -> {unique}")
+    taken.add(key(unique))
+    return unique
+
+
+def _table_key(name):
+    # Las tablas también tienen que tener nombres de archivo distintos (tables/<tabla>.tmdl)
+    return _file_name(name).lower()
+
+
+def _model_column(name, datatype, role, source_column="", expression=""):
+    data_type = DATA_TYPES.get(datatype, DEFAULT_DATA_TYPE)[0]
+    numeric = data_type in ("int64", "double")
+    return ModelColumnRecord(
+        name=name,
+        datatype=datatype,
+        data_type=data_type,
+        summarize_by="sum" if numeric and role == "measure" else "none",
+        source_column=source_column,
+        expression=expression
+    )
+
+
+def tmdl_name(name):
+    """
+    Nombre de objeto TMDL: entre comillas simples si no es un identificador simple.
+    """
+    if _TMDL_PLAIN_NAME.match(name):
+        return name
+    return "'" + name.replace("'", "''") + "'"
+
+
+def _m_name(name):
+    return name if _TMDL_PLAIN_NAME.match(name) else '#"' + name.replace('"', '""') + '"'
+
+
+def table_tmdl(table):
+    """
+    Texto TMDL de una tabla: medidas, columnas y partición.
+    """
+    lines = [f"table {tmdl_name(table.name)}", ""]
+    for measure in table.measures:
+        lines += [f"\tmeasure {tmdl_name(measure.name)} = {measure.expression}", ""]
+    for column in table.columns:
+        if column.expression:
+            lines.append(f"\tcolumn {tmdl_name(column.name)} = {column.expression}")
+        else:
+            lines.append(f"\tcolumn {tmdl_name(column.name)}")
+        lines.append(f"\t\tdataType: {column.data_type}")
+        lines.append(f"\t\tsummarizeBy: {column.summarize_by}")
+        if column.source_column:
+            lines.append(f"\t\tsourceColumn: {column.source_column}")
+        lines.append("")
+
+    m_columns = ", ".join(
+        f"{_m_name(column.name)} = {DATA_TYPES.get(column.datatype, DEFAULT_DATA_TYPE)[1]}"
+        for column in table.columns if not column.expression
+    )
+    lines += [
+        f"\tpartition {tmdl_name(table.name)} = m",
+        "\t\tmode: import",
+        "\t\tsource =",
+        "\t\t\t\tlet",
+        f"\t\t\t\t\t// Origen en Tableau: {table.relation_name or table.datasource} (reemplazar por la conexión real)",
+        f"\t\t\t\t\tOrigen = #table(type table [{m_columns}], {{}})",
+        "\t\t\t\tin",
+        "\t\t\t\t\tOrigen",
+        ""
+    ]
+    return "\n".join(lines)
+
+
+def semantic_model_files(tables):
+    """
+    Devuelve {ruta relativa a la carpeta .SemanticModel: texto} con todos los archivos del modelo.
+    """
+    files = {
+        "definition.pbism": json.dumps({"version": "4.0", "settings": {}}, indent=2) + "\n",
+        "definition/database.tmdl": f"database\n\tcompatibilityLevel: {COMPATIBILITY_LEVEL}\n",
+    }
+    model_lines = [
+        "model Model",
+        f"\tculture: {MODEL_CULTURE}",
+        "\tdefaultPowerBIDataSourceVersion: powerBI_V3",
+        f"\tsourceQueryCulture: {MODEL_CULTURE}",
+        ""
+    ]
+    for table in tables:
+        model_lines.append(f"ref table {tmdl_name(table.name)}")
+        files[f"definition/tables/{_file_name(table.name)}.tmdl"] = table_tmdl(table)
+    files["definition/model.tmdl"] = "\n".join(model_lines) + "\n"
+    return files
+
+
+def _file_name(name):
+    # Caracteres no válidos en nombres de archivo de Windows
+    return re.sub(r'[<>:"/\\|?*]', "_", name)
+
+
+def write_semantic_model(tables, output_path):
+    """
+    Escribe el modelo en output_path: una carpeta <nombre>.SemanticModel, o un único zip si
+    output_path termina en .zip. Devuelve la cantidad de archivos.
+    """
+    files = semantic_model_files(tables)
+    with tracing.span("write_semantic_model", "write", tables=len(tables)):
+        if output_path.lower().endswith(".zip"):
+            write_archive(output_path, {path: text.encode("utf-8") for path, text in files.items()})
+        else:
+            for path, text in files.items():
+                target = os.path.join(output_path, *path.split("/"))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "w", encoding="utf-8", newline="\n") as f:
+                    f.write(text)
+                tracing.count("files_written")
+    return len(files)
+
+
+def semantic_model_path_for(output_path):
+    """
+    Ruta del modelo de una conversión: <nombre>.SemanticModel junto a <nombre>.Report
+    (o <nombre>.SemanticModel.zip junto a <nombre>.Report.zip).
+    """
+    output_path = os.path.normpath(output_path)
+    extension = ""
+    if output_path.lower().endswith(".zip"):
+        base, extension = output_path[:-len(".zip")], ".zip"
+    elif os.path.basename(output_path) == "definition":
+        base = os.path.dirname(output_path)
+    else:
+        base = output_path
+    if base.endswith(".Report"):
+        base = base[:-len(".Report")]
+    return base + ".SemanticModel" + extension
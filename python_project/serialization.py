@@ -0,0 +1,67 @@
+import os
+import json
+
+from records import json_default
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""
+Serialización JSON de los archivos del reporte.
+JsonSerializer usa orjson si está instalado y, si no, la librería estándar; ambos backends
+producen exactamente los mismos bytes (UTF-8 sin escapar, claves en orden de inserción), por lo
+que la salida es estable entre ejecuciones y entre máquinas. El modo compacto omite la
+indentación, para pipelines que solo consumen los archivos de forma automática.
+"""
+
+BACKENDS = ("auto", "orjson", "json")
+
+
+class JsonSerializer:
+    """
+    Convierte estructuras (dicts, listas y registros) a bytes JSON.
+    """
+
+    def __init__(self, compact=False, backend="auto"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend JSON desconocido: {backend!r} (opciones: {', '.join(BACKENDS)})")
+        if backend == "orjson" and orjson is None:
+            raise ValueError("El backend 'orjson' no está instalado")
+        self.compact = compact
+        self.backend = "orjson" if backend == "auto" and orjson is not None else backend
+        if self.backend == "auto":
+            self.backend = "json"
+
+    def dumps(self, data):
+        if self.backend == "orjson":
+            option = 0 if self.compact else orjson.OPT_INDENT_2
+            return orjson.dumps(data, default=json_default, option=option)
+        if self.compact:
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        else:
+            text = json.dumps(data, ensure_ascii=False, indent=2, default=json_default)
+        return text.encode("utf-8")
+
+    def dump_file(self, path, data):
+        """
+        Escribe data en path (los saltos de línea son siempre "\\n", en cualquier sistema operativo).
+        """
+        payload = self.dumps(data)
+        with open(path, "wb") as f:
+            f.write(payload)
+        return len(payload)
+
+
+DEFAULT_SERIALIZER = JsonSerializer()
+
+
+def write_json(path, data, serializer=None, make_dirs=False):
+    """
+    Escribe data como JSON en path con el serializador indicado (o el predeterminado).
+    Devuelve la cantidad de bytes escritos.
+    """
+    if make_dirs:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    return (serializer or DEFAULT_SERIALIZER).dump_file(path, data)
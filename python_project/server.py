@@ -0,0 +1,296 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from main import convert_workbook, convert_job
+
+"""
+Servicio local de conversión con procesos de trabajo precalentados.
+Cada proceso del pool importa extractors/generators y hace una conversión mínima al iniciar,
+así los jobs no pagan el arranque de Python ni las importaciones. Los jobs llegan por HTTP
+(solo localhost) y usan las mismas opciones que convert_workbook_to_folder.
+
+Endpoints:
+    POST /convert  {"workbook": ruta, "output": carpeta definition o .zip, "archive": false, ...}
+    GET  /health   estado del servicio (503 si el pool de procesos está roto)
+    GET  /metrics  contadores de jobs y tiempos
+
+Uso como comando:
+    python server.py --port 8765 --workers 4 --max-pending 8
+"""
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Opciones de convert_workbook_to_folder que un job puede indicar
+JOB_OPTIONS = ("streaming", "pipelined", "io_threads", "incremental", "cache_dir", "compact_json",
+               "json_backend", "archive", "trace_path", "trace_format", "semantic_model")
+
+# Workbook mínimo para calentar cada proceso (recorre el parseo y la escritura en memoria)
+_WARMUP_WORKBOOK = b"<workbook><datasources/><worksheets/><dashboards/></workbook>"
+
+
+class ServiceBusy(Exception):
+    """
+    Se alcanzó el límite de jobs simultáneos.
+    """
+
+
+def _warm_worker():
+    """
+    Inicializador de cada proceso del pool.
+    """
+    convert_workbook(_WARMUP_WORKBOOK, name="warmup")
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+class ConversionService:
+    """
+    Pool de procesos precalentados con un límite de jobs en vuelo (en ejecución o en cola).
+    Si el límite está lleno, convert() lanza ServiceBusy en lugar de encolar sin límite.
+    Si un proceso muere, el pool queda roto (BrokenProcessPool): se recrea con procesos
+    precalentados y el job afectado se devuelve con error.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self.started = time.time()
+        self._executor = self._new_executor()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._metrics = {
+            "jobs_total": 0,
+            "jobs_succeeded": 0,
+            "jobs_failed": 0,
+            "jobs_rejected": 0,
+            "jobs_in_flight": 0,
+            "pool_restarts": 0,
+            "seconds_total": 0.0,
+            "seconds_max": 0.0
+        }
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+
+    def _restart(self, executor):
+        """
+        Sustituye el pool roto por uno nuevo y lo devuelve. Si otro hilo ya lo recreó, devuelve el actual.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = self._new_executor()
+                self._metrics["pool_restarts"] += 1
+                executor.shutdown(wait=False, cancel_futures=True)
+            return self._executor
+
+    def _submit(self, fn, *args, **kwargs):
+        """
+        Encola fn en el pool. Si el pool ya estaba roto el job no llegó a ejecutarse,
+        así que se recrea el pool y se encola de nuevo.
+        """
+        executor = self._executor
+        try:
+            return executor, executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            executor = self._restart(executor)
+            return executor, executor.submit(fn, *args, **kwargs)
+
+    def warm_up(self):
+        """
+        Arranca todos los procesos del pool antes del primer job. Devuelve sus PIDs.
+        """
+        futures = [self._submit(_worker_pid)[1] for _ in range(self.workers)]
+        return sorted({future.result() for future in futures})
+
+    def convert(self, job):
+        """
+        Ejecuta un job ({"workbook", "output", opciones...}) y devuelve el resumen de la conversión
+        (el de convert_workbook_to_folder, con "error" en None o el mensaje del error).
+        """
+        twb_path, output_path, options = _parse_job(job)
+        if not self._slots.acquire(blocking=False):
+            self._count(jobs_rejected=1)
+            raise ServiceBusy(f"Hay {self.max_pending} jobs en curso; reintente más tarde")
+        self._count(jobs_in_flight=1)
+        start = time.perf_counter()
+        executor = None
+        try:
+            executor, future = self._submit(convert_job, twb_path, output_path, **options)
+            result = future.result()
+        except BrokenProcessPool as e:
+            # Un proceso murió durante el job: se recrea el pool para los jobs siguientes
+            if executor is not None:
+                self._restart(executor)
+            result = {"workbook": twb_path, "output_path": output_path, "dashboards": 0, "visuals": 0,
+                      "error": f"El proceso de conversión terminó de forma inesperada: {e}"}
+        except Exception as e:
+            result = {"workbook": twb_path, "output_path": output_path, "dashboards": 0, "visuals": 0, "error": str(e)}
+        finally:
+            self._slots.release()
+        elapsed = time.perf_counter() - start
+        result["seconds"] = round(elapsed, 4)
+        with self._lock:
+            self._metrics["jobs_in_flight"] -= 1
+            self._metrics["jobs_total"] += 1
+            self._metrics["jobs_failed" if result["error"] else "jobs_succeeded"] += 1
+            self._metrics["seconds_total"] += elapsed
+            self._metrics["seconds_max"] = max(self._metrics["seconds_max"], elapsed)
+        return result
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._metrics[key] += value
+
+    def pool_broken(self):
+        """
+        True si el pool actual tiene algún proceso muerto (lo marca el propio ProcessPoolExecutor).
+        """
+        return bool(getattr(self._executor, "_broken", False))
+
+    def health(self):
+        with self._lock:
+            restarts = self._metrics["pool_restarts"]
+        return {
+            "status": "broken" if self.pool_broken() else "ok",
+            "pid": os.getpid(),
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pool_restarts": restarts,
+            "uptime_seconds": round(time.time() - self.started, 1)
+        }
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["seconds_avg"] = metrics["seconds_total"] / metrics["jobs_total"] if metrics["jobs_total"] else 0.0
+        metrics["workers"] = self.workers
+        metrics["max_pending"] = self.max_pending
+        return metrics
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def _parse_job(job):
+    """
+    Valida el cuerpo de un job y devuelve (workbook, output, opciones).
+    """
+    if not isinstance(job, dict):
+        raise ValueError("El job debe ser un objeto JSON")
+    twb_path = job.get("workbook")
+    output_path = job.get("output")
+    if not isinstance(twb_path, str) or not twb_path:
+        raise ValueError("Falta 'workbook' (ruta al .twb/.twbx)")
+    if not isinstance(output_path, str) or not output_path:
+        raise ValueError("Falta 'output' (carpeta definition o archivo .zip)")
+    unknown = set(job) - {"workbook", "output"} - set(JOB_OPTIONS)
+    if unknown:
+        raise ValueError(f"Opciones desconocidas: {', '.join(sorted(unknown))}")
+    options = {key: job[key] for key in JOB_OPTIONS if key in job}
+    return twb_path, output_path, options
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Atiende /convert, /health y /metrics con el ConversionService del servidor.
+    """
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            health = service.health()
+            self._send_json(200 if health["status"] == "ok" else 503, health)
+        elif self.path == "/metrics":
+            self._send_json(200, service.metrics())
+        else:
+            self._send_json(404, {"error": f"Ruta desconocida: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/convert":
+            self._send_json(404, {"error": f"Ruta desconocida: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length) or b"null")
+            result = self.server.service.convert(job)
+        except ServiceBusy as e:
+            self._send_json(503, {"error": str(e)})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(422 if result["error"] else 200, result)
+
+    def _send_json(self, status, data):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {format % args}")
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, max_pending=None):
+    """
+    Crea el servidor HTTP con su ConversionService (port=0 elige un puerto libre).
+    Los procesos quedan precalentados antes de devolverlo.
+    """
+    service = ConversionService(workers=workers, max_pending=max_pending)
+    service.warm_up()
+    httpd = ThreadingHTTPServer((host, port), ConversionRequestHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    return httpd
+
+
+def submit_job(workbook, output, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=None, **options):
+    """
+    Cliente mínimo: envía un job al servicio y devuelve (código HTTP, respuesta).
+    """
+    body = json.dumps({"workbook": workbook, "output": output, **options}).encode("utf-8")
+    request = urllib.request.Request(f"{url}/convert", data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio local de conversión Tableau -> Power BI.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos de conversión (por defecto, uno por CPU)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Jobs simultáneos (en ejecución o en cola) antes de responder 503")
+    args = parser.parse_args(argv)
+    httpd = create_server(args.host, args.port, args.workers, args.max_pending)
+    host, port = httpd.server_address[:2]
+    print(f"Servicio de conversión en http://{host}:{port} ({httpd.service.workers} procesos)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
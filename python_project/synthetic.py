@@ -0,0 +1,191 @@
+import sys
+import math
+import random
+import argparse
+import xml.etree.ElementTree as ET
+
+"""
+Generador de workbooks Tableau (.twb) sintéticos para benchmarks y pruebas de carga.
+Reproduce la estructura que leen extractors.py (datasources con relaciones, worksheets con
+dependencias, columnas calculadas y marcas, dashboards con zonas) con tamaños configurables.
+Con la misma semilla el archivo generado es siempre el mismo.
+
+Uso como comando:
+    python synthetic.py salida.twb --dashboards 10 --worksheets 200 --zones 8 --datasources 4 --columns 30 --calculated 10
+"""
+
+# Tipos de marca que se reparten entre los worksheets (Automatic termina en una tabla)
+MARK_CLASSES = ("Bar", "Bar", "Line", "Pie", "Automatic")
+
+DERIVATIONS = ("Sum", "Promedio", "Recuento", "Minimo", "Maximo", "None")
+
+# Tamaño de un dashboard en unidades de zona de Tableau
+_ZONE_UNITS = 100000
+
+
+def generate_workbook(dashboards=1, worksheets=3, zones=3, datasources=1, columns=6, calculated=2, seed=0):
+    """
+    Arma un workbook sintético y devuelve su ElementTree.
+    dashboards: cantidad de dashboards; worksheets: cantidad total de worksheets;
+    zones: zonas (worksheets) por dashboard; datasources: datasources del workbook;
+    columns: columnas físicas por datasource; calculated: campos calculados por datasource.
+    """
+    rng = random.Random(seed)
+    root = ET.Element("workbook", {"source-build": "synthetic", "version": "18.1"})
+
+    datasources_elem = ET.SubElement(root, "datasources")
+    sources = [_add_datasource(datasources_elem, index, columns, calculated) for index in range(max(datasources, 1))]
+
+    worksheets_elem = ET.SubElement(root, "worksheets")
+    worksheet_names = []
+    for index in range(worksheets):
+        name = f"Hoja {index + 1}"
+        worksheet_names.append(name)
+        _add_worksheet(worksheets_elem, name, sources[index % len(sources)], MARK_CLASSES[index % len(MARK_CLASSES)], rng)
+
+    dashboards_elem = ET.SubElement(root, "dashboards")
+    for index in range(dashboards):
+        names = [worksheet_names[(index * zones + offset) % len(worksheet_names)]
+                 for offset in range(zones)] if worksheet_names else []
+        _add_dashboard(dashboards_elem, f"Dashboard {index + 1}", names)
+    return ET.ElementTree(root)
+
+
+def write_workbook(path, **params):
+    """
+    Genera un workbook sintético (ver generate_workbook) y lo guarda en path. Devuelve path.
+    """
+    tree = generate_workbook(**params)
+    tree.write(path, encoding="utf-8", xml_declaration=True)
+    return path
+
+
+def _add_datasource(parent, index, columns, calculated):
+    """
+    Agrega un datasource con su relación a una tabla Excel y devuelve su descripción.
+    """
+    name = f"federated.synthetic{index:04d}"
+    caption = f"Tabla{index + 1}"
+    datasource = ET.SubElement(parent, "datasource", {"caption": caption, "inline": "true", "name": name})
+    connection = ET.SubElement(datasource, "connection", {"class": "federated"})
+    named_connections = ET.SubElement(connection, "named-connections")
+    named_connection = ET.SubElement(named_connections, "named-connection",
+                                     {"caption": "Sintetico", "name": f"excel-direct.synthetic{index:04d}"})
+    ET.SubElement(named_connection, "connection", {"class": "excel-direct", "filename": f"datos{index + 1}.xlsx"})
+    relation = ET.SubElement(connection, "relation", {"type": "collection"})
+    ET.SubElement(relation, "relation", {
+        "connection": f"excel-direct.synthetic{index:04d}", "name": f"Hoja{index + 1}",
+        "table": f"[Hoja{index + 1}$]", "type": "table"
+    })
+
+    # La mitad de las columnas son dimensiones (texto) y la otra mitad medidas (números)
+    fields = []
+    for column in range(max(columns, 2)):
+        if column % 2 == 0:
+            fields.append({"name": f"Dimension{column}", "role": "dimension", "datatype": "string", "formula": ""})
+        else:
+            fields.append({"name": f"Medida{column}", "role": "measure", "datatype": "real", "formula": ""})
+    measures = [field["name"] for field in fields if field["role"] == "measure"]
+    for calc in range(calculated):
+        left, right = measures[calc % len(measures)], measures[(calc + 1) % len(measures)]
+        fields.append({
+            "name": f"Calculation_{index:04d}{calc:04d}", "caption": f"Calculado {calc + 1}",
+            "role": "measure", "datatype": "real", "formula": f"SUM([{left}]) / SUM([{right}])"
+        })
+    for field in fields:
+        column = ET.SubElement(datasource, "column", {
+            "caption": field.get("caption", field["name"]), "datatype": field["datatype"],
+            "name": f"[{field['name']}]", "role": field["role"], "type": "nominal" if field["role"] == "dimension" else "quantitative"
+        })
+        if field["formula"]:
+            ET.SubElement(column, "calculation", {"class": "tableau", "formula": field["formula"]})
+    return {"name": name, "caption": caption, "fields": fields}
+
+
+def _add_worksheet(parent, name, source, mark_class, rng):
+    """
+    Agrega un worksheet con una dimensión, una o más medidas y la marca indicada.
+    """
+    dimensions = [field for field in source["fields"] if field["role"] == "dimension"]
+    measures = [field for field in source["fields"] if field["role"] == "measure"]
+    dimension = rng.choice(dimensions)
+    used_measures = rng.sample(measures, min(len(measures), rng.randint(1, 3)))
+
+    worksheet = ET.SubElement(parent, "worksheet", {"name": name})
+    layout_options = ET.SubElement(worksheet, "layout-options")
+    title = ET.SubElement(layout_options, "title")
+    formatted_text = ET.SubElement(title, "formatted-text")
+    ET.SubElement(formatted_text, "run").text = f"Título de {name}"
+
+    table = ET.SubElement(worksheet, "table")
+    view = ET.SubElement(table, "view")
+    view_datasources = ET.SubElement(view, "datasources")
+    ET.SubElement(view_datasources, "datasource", {"caption": source["caption"], "name": source["name"]})
+    dependencies = ET.SubElement(view, "datasource-dependencies", {"datasource": source["name"]})
+    for field in [dimension] + used_measures:
+        column = ET.SubElement(dependencies, "column", {
+            "caption": field.get("caption", field["name"]), "datatype": field["datatype"],
+            "name": f"[{field['name']}]", "role": field["role"]
+        })
+        if field["formula"]:
+            ET.SubElement(column, "calculation", {"class": "tableau", "formula": field["formula"]})
+    ET.SubElement(dependencies, "column-instance", {
+        "column": f"[{dimension['name']}]", "derivation": "None", "name": f"[none:{dimension['name']}:nk]", "pivot": "key"
+    })
+    for field in used_measures:
+        derivation = rng.choice(DERIVATIONS)
+        ET.SubElement(dependencies, "column-instance", {
+            "column": f"[{field['name']}]", "derivation": derivation,
+            "name": f"[{derivation.lower()}:{field['name']}:qk]", "pivot": "key"
+        })
+
+    panes = ET.SubElement(table, "panes")
+    pane = ET.SubElement(panes, "pane")
+    ET.SubElement(pane, "mark", {"class": mark_class})
+
+    dimension_ref = f"[{source['name']}].[none:{dimension['name']}:nk]"
+    measure_ref = f"[{source['name']}].[sum:{used_measures[0]['name']}:qk]"
+    # Barras horizontales (dimensión en filas) y verticales (dimensión en columnas) alternadas
+    horizontal = rng.random() < 0.5
+    ET.SubElement(table, "rows").text = dimension_ref if horizontal else measure_ref
+    ET.SubElement(table, "cols").text = measure_ref if horizontal else dimension_ref
+
+
+def _add_dashboard(parent, name, worksheet_names):
+    """
+    Agrega un dashboard con una zona por worksheet, repartidas en una grilla.
+    """
+    dashboard = ET.SubElement(parent, "dashboard", {"name": name})
+    ET.SubElement(dashboard, "size", {"maxheight": "800", "maxwidth": "1000", "minheight": "800", "minwidth": "1000"})
+    zones_elem = ET.SubElement(dashboard, "zones")
+    layout = ET.SubElement(zones_elem, "zone", {"h": str(_ZONE_UNITS), "id": "1", "type-v2": "layout-basic",
+                                                "w": str(_ZONE_UNITS), "x": "0", "y": "0"})
+    columns = max(1, math.ceil(math.sqrt(len(worksheet_names))))
+    rows = max(1, math.ceil(len(worksheet_names) / columns))
+    width, height = _ZONE_UNITS // columns, _ZONE_UNITS // rows
+    for index, worksheet_name in enumerate(worksheet_names):
+        ET.SubElement(layout, "zone", {
+            "h": str(height), "id": str(index + 2), "name": worksheet_name, "w": str(width),
+            "x": str((index % columns) * width), "y": str((index // columns) * height)
+        })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un workbook Tableau (.twb) sintético.")
+    parser.add_argument("output", help="Archivo .twb de salida")
+    parser.add_argument("--dashboards", type=int, default=1)
+    parser.add_argument("--worksheets", type=int, default=3)
+    parser.add_argument("--zones", type=int, default=3, help="Zonas (worksheets) por dashboard")
+    parser.add_argument("--datasources", type=int, default=1)
+    parser.add_argument("--columns", type=int, default=6, help="Columnas por datasource")
+    parser.add_argument("--calculated", type=int, default=2, help="Campos calculados por datasource")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    write_workbook(args.output, dashboards=args.dashboards, worksheets=args.worksheets, zones=args.zones,
+                   datasources=args.datasources, columns=args.columns, calculated=args.calculated, seed=args.seed)
+    print(f"Workbook sintético generado en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import string
+
+"""
+Motor de plantillas para los contenedores de visuals PBIR.
+Una plantilla es un esqueleto (dicts/listas anidados) con marcadores Slot y Format.
+VisualTemplate lo compila una sola vez a una función Python equivalente a un literal
+anidado escrito a mano; render() solo rellena los marcadores con los valores de cada visual.
+
+Un mismo objeto usado en varios lugares del esqueleto (p. ej. el Column de un campo que se
+repite en la proyección, el orden y el filtro) se construye una sola vez por render y se
+reutiliza. Los contenedores se crean nuevos en cada render, así que los resultados de
+distintos visuals no comparten objetos.
+"""
+
+
+class Slot:
+    """
+    Marcador que se reemplaza por values[name].
+    """
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        if not name.isidentifier():
+            raise ValueError(f"Nombre de slot inválido: {name!r}")
+        self.name = name
+
+    def __repr__(self):
+        return f"Slot({self.name!r})"
+
+
+class Format:
+    """
+    Marcador de texto que se reemplaza por pattern.format_map(values)
+    (solo campos simples, p. ej. "{entity}.{category}").
+    """
+    __slots__ = ("pattern", "fields")
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.fields = [field for _, field, _, _ in string.Formatter().parse(pattern) if field is not None]
+        for field in self.fields:
+            if not field.isidentifier():
+                raise ValueError(f"Campo inválido en {pattern!r}: {field!r}")
+
+    def __repr__(self):
+        return f"Format({self.pattern!r})"
+
+
+class VisualTemplate:
+    """
+    Esqueleto compilado de un contenedor de visual.
+    """
+
+    def __init__(self, skeleton):
+        self.slots = set()
+        self._uses = {}
+        self._count_uses(skeleton)
+        self._shared = []
+        self._shared_names = {}
+        body = self._expression(skeleton)
+        lines = ["def render(values):"]
+        lines += [f"    _v_{slot} = values[{slot!r}]" for slot in sorted(self.slots)]
+        lines += [f"    {name} = {expression}" for name, expression in self._shared]
+        lines.append(f"    return {body}")
+        self.source = "\n".join(lines)
+        namespace = {}
+        exec(compile(self.source, "<visual-template>", "exec"), namespace)
+        self.render = namespace["render"]
+
+    def _count_uses(self, node):
+        if isinstance(node, (dict, list)):
+            self._uses[id(node)] = self._uses.get(id(node), 0) + 1
+            if self._uses[id(node)] > 1:
+                return
+            for child in node.values() if isinstance(node, dict) else node:
+                self._count_uses(child)
+        elif isinstance(node, Slot):
+            self.slots.add(node.name)
+        elif isinstance(node, Format):
+            self.slots.update(node.fields)
+
+    def _expression(self, node):
+        """
+        Devuelve el código Python que construye node. Los nodos compartidos se asignan
+        a una variable local (en orden, después de sus propios nodos compartidos).
+        """
+        if id(node) in self._shared_names:
+            return self._shared_names[id(node)]
+
+        if isinstance(node, dict):
+            items = ", ".join(f"{key!r}: {self._expression(value)}" for key, value in node.items())
+            expression = "{" + items + "}"
+        elif isinstance(node, list):
+            expression = "[" + ", ".join(self._expression(value) for value in node) + "]"
+        elif isinstance(node, Slot):
+            return f"_v_{node.name}"
+        elif isinstance(node, Format):
+            text = ""
+            for literal, field, _, _ in string.Formatter().parse(node.pattern):
+                text += literal.replace("{", "{{").replace("}", "}}")
+                if field is not None:
+                    text += "{_v_" + field + "}"
+            return "f" + repr(text)
+        else:
+            return repr(node)
+
+        if self._uses.get(id(node), 0) > 1:
+            name = f"_shared{len(self._shared)}"
+            self._shared.append((name, expression))
+            self._shared_names[id(node)] = name
+            return name
+        return expression
@@ -0,0 +1,67 @@
+import pytest
+
+from dax import DaxTranslationError, TranslationCache, translate_calculations
+
+"""
+Pruebas de la traducción de campos calculados a DAX (python -m pytest desde python_project).
+"""
+
+
+def _column(name, formula="", datatype=""):
+    return {"name": f"[{name}]", "caption": name, "role": "dimension",
+            "datatype": datatype, "calculation_formula": formula}
+
+
+def _translate(formula, datatypes):
+    columns = [_column(name, datatype=datatype) for name, datatype in datatypes.items()]
+    columns.append(_column("Resultado", formula))
+    return translate_calculations(columns, "Ventas", TranslationCache())["resultado"]
+
+
+def test_plus_concatenates_string_fields():
+    record = _translate("[Nombre] + [Apellido]", {"Nombre": "string", "Apellido": "string"})
+    assert record.error == ""
+    assert record.expression == "'Ventas'[Nombre] & 'Ventas'[Apellido]"
+
+
+def test_plus_concatenates_string_literals_and_functions():
+    record = _translate("[Ciudad] + ', ' + UPPER([Pais])", {"Ciudad": "", "Pais": ""})
+    assert record.expression == "('Ventas'[Ciudad] & \", \") & UPPER('Ventas'[Pais])"
+
+
+def test_plus_adds_numbers():
+    record = _translate("[Precio] + [Impuesto]", {"Precio": "real", "Impuesto": "integer"})
+    assert record.expression == "'Ventas'[Precio] + 'Ventas'[Impuesto]"
+    assert _translate("[Precio] + 1", {"Precio": ""}).expression == "'Ventas'[Precio] + 1"
+
+
+def test_plus_uses_type_of_referenced_calculation():
+    columns = [_column("Nombre", datatype="string"),
+               _column("Etiqueta", "[Nombre] + '!'", datatype="string"),
+               _column("Resultado", "[Etiqueta] + [Otro]")]
+    record = translate_calculations(columns, "Ventas", TranslationCache())["resultado"]
+    assert record.expression == "'Ventas'[Etiqueta] & 'Ventas'[Otro]"
+
+
+def test_plus_with_unknown_types_is_an_error():
+    record = _translate("[A] + [B]", {"A": "", "B": ""})
+    assert record.expression == ""
+    assert "suma o concatena" in record.error
+
+
+def test_cache_distinguishes_datatypes():
+    cache = TranslationCache()
+    assert cache.translate("[A] + [B]", "T", datatypes={"a": "string"})[0] == "'T'[A] & 'T'[B]"
+    assert cache.translate("[A] + [B]", "T", datatypes={"a": "real"})[0] == "'T'[A] + 'T'[B]"
+    with pytest.raises(DaxTranslationError):
+        cache.translate("[A] + [B]", "T")
+
+
+def test_cache_is_bounded():
+    cache = TranslationCache(max_entries=2)
+    for value in range(5):
+        cache.translate(f"[A] * {value}", "T")
+    cache.translate("[A] * 4", "T")
+    stats = cache.stats()
+    assert stats["formulas"] == 2 and stats["translations"] == 2
+    assert stats["hits"] == 1 and stats["misses"] == 5
@@ -0,0 +1,27 @@
+import os
+
+from main import convert_batch, convert_job
+
+"""
+Pruebas de la conversión por jobs y en batch (python -m pytest desde python_project).
+"""
+
+
+def test_invalid_workbook_is_a_failed_job(tmp_path):
+    twb_path = tmp_path / "roto.twb"
+    twb_path.write_text("<bad", encoding="utf-8")
+    output_path = tmp_path / "salida" / "roto.Report" / "definition"
+    for streaming in (False, True):
+        result = convert_job(str(twb_path), str(output_path), streaming=streaming)
+        assert result["error"]
+        assert not os.path.exists(tmp_path / "salida")
+
+
+def test_invalid_workbook_is_reported_as_failed_in_batch(tmp_path):
+    source = tmp_path / "workbooks"
+    source.mkdir()
+    (source / "roto.twb").write_text("<bad", encoding="utf-8")
+    summary = convert_batch(str(source), str(tmp_path / "salida"), workers=1)
+    assert summary["failed"] == 1 and summary["succeeded"] == 0
+    assert summary["results"][0]["error"]
+    assert sorted(os.listdir(tmp_path / "salida")) == ["batch_summary.json"]
@@ -0,0 +1,19 @@
+import pytest
+
+import xml_backend
+from parse_cache import ParseCache, load_or_extract
+
+"""
+Pruebas de la caché del modelo extraído (python -m pytest desde python_project).
+"""
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_invalid_workbook_is_not_cached(tmp_path, streaming):
+    twb_path = tmp_path / "roto.twb"
+    twb_path.write_text("<workbook><worksheets><worksheet name='Hoja 1'>", encoding="utf-8")
+    cache = ParseCache(str(tmp_path / "cache"))
+    with pytest.raises(xml_backend.ParseError):
+        load_or_extract(str(twb_path), cache, streaming)
+    assert cache.get(cache.key_for(str(twb_path))) is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,71 @@
+from dax import TranslationCache
+from generators import generate_json_bar_graph
+from semantic_model import build_semantic_model, model_names, semantic_model_files
+
+"""
+Pruebas del modelo semántico TMDL (python -m pytest desde python_project).
+"""
+
+
+def _worksheet(name, datasources, dependencies):
+    return {"worksheet": {"worksheet_name": name, "worksheet_datasources": datasources,
+                          "dependency_info": dependencies}}
+
+
+def _column(name, datatype="string", role="dimension", formula="", caption=""):
+    return {"name": f"[{name}]", "caption": caption, "role": role, "datatype": datatype,
+            "calculation_formula": formula}
+
+
+def test_duplicate_table_names_get_a_suffix():
+    extracted_data = [
+        _worksheet("Hoja 1", [{"name": "federated.a", "caption": "Ventas"}],
+                   [{"datasource": "federated.a", "columns": [_column("Region")]}]),
+        _worksheet("Hoja 2", [{"name": "federated.b", "caption": "ventas"}],
+                   [{"datasource": "federated.b", "columns": [_column("Pais")]}]),
+    ]
+    tables = build_semantic_model(extracted_data, TranslationCache())
+    assert [table.name for table in tables] == ["Ventas", "ventas (2)"]
+    files = semantic_model_files(tables)
+    assert "definition/tables/Ventas.tmdl" in files
+    assert "definition/tables/ventas (2).tmdl" in files
+
+
+def test_calculation_named_like_a_column_gets_a_suffix():
+    columns = [
+        _column("Importe", "real", "measure"),
+        _column("Calculation_1", "real", "measure", "SUM([Importe])", caption="importe"),
+        _column("Calculation_2", "real", "measure", "[Calculation_1] * 2", caption="Doble"),
+    ]
+    extracted_data = [_worksheet("Hoja 1", [{"name": "federated.a", "caption": "Ventas"}],
+                                 [{"datasource": "federated.a", "columns": columns}])]
+    table = build_semantic_model(extracted_data, TranslationCache())[0]
+    assert [column.name for column in table.columns] == ["Importe"]
+    assert [(measure.name, measure.expression) for measure in table.measures] == [
+        ("importe (2)", "SUM('Ventas'[Importe])"),
+        ("Doble", "[importe (2)] * 2"),
+    ]
+
+
+def test_visuals_use_the_model_names():
+    columns = [
+        _column("Region"),
+        _column("Importe", "real", "measure"),
+        _column("Calculation_1", "real", "measure", "SUM([Importe])", caption="importe"),
+    ]
+    worksheets = []
+    for index, datasource in enumerate(("federated.a", "federated.b"), 1):
+        worksheet = _worksheet(f"Hoja {index}", [{"name": datasource, "caption": "Ventas"}],
+                               [{"datasource": datasource, "columns": columns,
+                                 "column_instances": [{"column": "[Calculation_1]", "derivation": "User"}]}])
+        worksheet["worksheet"].update(cols=["Region"], rows=["Calculation_1"], worksheet_title="", type="Bar")
+        worksheets.append(worksheet)
+    names = model_names(worksheets)
+    tables = build_semantic_model(worksheets, TranslationCache(), names)
+    defined = {(table.name, measure.name) for table in tables for measure in table.measures}
+
+    for worksheet in worksheets:
+        visual = generate_json_bar_graph([worksheet], "visual", names=names)
+        value = visual["visual"]["query"]["queryState"]["Y"]["projections"][0]["field"]["Measure"]
+        assert (value["Expression"]["SourceRef"]["Entity"], value["Property"]) in defined
+    assert defined == {("Ventas", "importe (2)"), ("Ventas (2)", "importe (2)")}
@@ -0,0 +1,31 @@
+import os
+
+from server import ConversionService
+
+"""
+Pruebas del servicio de conversión (python -m pytest desde python_project).
+"""
+
+_WORKBOOK = "<workbook><datasources/><worksheets/><dashboards/></workbook>"
+
+
+def _kill_worker():
+    os._exit(1)
+
+
+def test_service_recovers_from_a_dead_worker(tmp_path):
+    twb_path = tmp_path / "vacio.twb"
+    twb_path.write_text(_WORKBOOK, encoding="utf-8")
+    service = ConversionService(workers=1)
+    try:
+        service.warm_up()
+        executor, future = service._submit(_kill_worker)
+        assert future.exception() is not None
+        assert service.health()["status"] == "broken"
+
+        result = service.convert({"workbook": str(twb_path), "output": str(tmp_path / "definition")})
+        assert result["error"] is None
+        health = service.health()
+        assert health["status"] == "ok" and health["pool_restarts"] == 1
+    finally:
+        service.close()
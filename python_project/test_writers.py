@@ -0,0 +1,17 @@
+from report_tree import ReportTree
+from writers import TreeWriter
+
+"""
+Pruebas de los writers del reporte (python -m pytest desde python_project).
+"""
+
+
+def test_tree_writer_stores_independent_copies():
+    visual = {"name": "a", "visual": {"query": {"Values": [{"field": "Ventas"}]}}}
+    tree = ReportTree()
+    with TreeWriter(tree, root="/definition") as writer:
+        writer.store_json("/definition/pages/p1/visuals/a/visual.json", visual)
+        writer.store_json("/definition/pages/p2/visuals/a/visual.json", visual)
+    tree["pages/p1/visuals/a/visual.json"]["visual"]["query"]["Values"].clear()
+    assert tree["pages/p2/visuals/a/visual.json"]["visual"]["query"]["Values"] == [{"field": "Ventas"}]
+    assert visual["visual"]["query"]["Values"] == [{"field": "Ventas"}]
@@ -0,0 +1,43 @@
+import pytest
+
+import xml_backend
+from extractors import parse_workbook, extract_dashboards_and_worksheets
+from mapped_input import open_mapped
+
+"""
+Pruebas del backend de parseo XML (python -m pytest desde python_project).
+"""
+
+WORKBOOK = """<?xml version='1.0' encoding='utf-8' ?>
+<workbook>
+  <dashboards>
+    <dashboard name='Panel'>
+      <zones><zone name='Hoja 1' x='0' y='0' w='100' h='100' /></zones>
+    </dashboard>
+  </dashboards>
+</workbook>
+"""
+
+
+@pytest.fixture
+def lxml_backend():
+    pytest.importorskip("lxml")
+    previous = xml_backend.get_backend()
+    xml_backend.set_backend("lxml")
+    yield
+    xml_backend.set_backend(previous)
+
+
+def test_lxml_parses_mapped_workbook(tmp_path, lxml_backend):
+    path = tmp_path / "panel.twb"
+    # Más grande que un bloque de mapped_input, para que el parser reciba varios
+    path.write_text(WORKBOOK.replace("<dashboards>", "<dashboards>" + " " * 200000), encoding="utf-8")
+    dashboards = extract_dashboards_and_worksheets(parse_workbook(str(path)))
+    assert [dashboard["worksheet_names"] for dashboard in dashboards] == [["Hoja 1"]]
+
+
+def test_lxml_invalid_workbook_is_a_parse_error(tmp_path, lxml_backend):
+    path = tmp_path / "invalido.twb"
+    path.write_text("<bad", encoding="utf-8")
+    with pytest.raises(xml_backend.ParseError), open_mapped(str(path)) as source:
+        xml_backend.parse(source)
@@ -0,0 +1,256 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from serialization import write_json
+
+"""
+Trazas por etapa de la conversión (parseo, extracción, generación de visuals, escritura).
+Cada span registra tiempo real, tiempo de CPU del hilo y argumentos (conteos de objetos,
+bytes escritos). Los contadores globales de la ejecución (archivos y bytes escritos) se
+acumulan con count(); add() suma además al span abierto más interno del hilo actual, así los
+bytes de cada archivo quedan en el span que lo escribió (write_visual, dashboard...). Los spans
+con argumento "dashboard" se agrupan en el resumen por dashboard, también cuando los visuals se
+escriben en los hilos de PipelinedWriter, fuera del span del dashboard.
+
+Con las trazas desactivadas (sin Tracer activo) span() devuelve un contexto vacío compartido
+y count() no hace nada, así que el costo es una consulta a una variable global.
+El Tracer activo es uno por proceso (los hilos de PipelinedWriter registran en el mismo).
+
+Formatos de exportación:
+    "chrome": eventos "X" de Chrome Trace (chrome://tracing, Perfetto)
+    "json":   lista de spans, resumen por etapa y contadores
+"""
+
+TRACE_FORMATS = ("chrome", "json")
+
+_active = None
+
+
+class _NullSpan:
+    """
+    Span vacío que se usa cuando no hay trazas activas.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    Intervalo medido; set() agrega argumentos (p. ej. conteos) antes de cerrarlo.
+    """
+    __slots__ = ("tracer", "name", "category", "args", "start", "cpu_start", "wall", "cpu", "thread")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def add(self, name, value):
+        self.args[name] = self.args.get(name, 0) + value
+
+    def __enter__(self):
+        self.thread = threading.get_ident()
+        self.tracer._open_spans().append(self)
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall = time.perf_counter() - self.start
+        self.cpu = time.thread_time() - self.cpu_start
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._open_spans().pop()
+        self.tracer._finish(self)
+        return False
+
+
+class Tracer:
+    """
+    Acumula los spans y contadores de una ejecución.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        # Pila de spans abiertos de cada hilo
+        self._local = threading.local()
+
+    def span(self, name, category="stage", **args):
+        return Span(self, name, category, args)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add(self, name, value=1):
+        """
+        Suma value al contador name y al argumento name del span abierto más interno del hilo.
+        """
+        self.count(name, value)
+        spans = self._open_spans()
+        if spans:
+            spans[-1].add(name, value)
+
+    def _open_spans(self):
+        spans = getattr(self._local, "spans", None)
+        if spans is None:
+            spans = self._local.spans = []
+        return spans
+
+    def _finish(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """
+        Devuelve {"stages": {nombre: {count, wall_s, cpu_s}}, "counters": {...},
+        "dashboards": {dashboard: {files_written, bytes_written}}}.
+        """
+        stages = {}
+        dashboards = {}
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        for span in spans:
+            stage = stages.setdefault(span.name, {"count": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            stage["count"] += 1
+            stage["wall_s"] += span.wall
+            stage["cpu_s"] += span.cpu
+            if "dashboard" in span.args and "bytes_written" in span.args:
+                totals = dashboards.setdefault(span.args["dashboard"], {"files_written": 0, "bytes_written": 0})
+                totals["files_written"] += span.args.get("files_written", 0)
+                totals["bytes_written"] += span.args["bytes_written"]
+        for stage in stages.values():
+            stage["wall_s"] = round(stage["wall_s"], 6)
+            stage["cpu_s"] = round(stage["cpu_s"], 6)
+        return {"stages": stages, "counters": counters, "dashboards": dashboards}
+
+    def to_json(self):
+        spans = sorted(self.spans, key=lambda s: s.start)
+        return {
+            "spans": [
+                {
+                    "name": span.name,
+                    "category": span.category,
+                    "start_ms": round((span.start - self.origin) * 1000, 3),
+                    "wall_ms": round(span.wall * 1000, 3),
+                    "cpu_ms": round(span.cpu * 1000, 3),
+                    "thread": span.thread,
+                    "args": span.args
+                }
+                for span in spans
+            ],
+            **self.summary()
+        }
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.origin) * 1e6, 1),
+                "dur": round(span.wall * 1e6, 1),
+                "pid": pid,
+                "tid": span.thread,
+                "args": {**span.args, "cpu_ms": round(span.cpu * 1000, 3)}
+            }
+            for span in sorted(self.spans, key=lambda s: s.start)
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.summary()}
+
+    def write(self, path, trace_format="chrome"):
+        """
+        Guarda la traza en path en el formato indicado (ver TRACE_FORMATS).
+        """
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(f"Formato de traza desconocido: {trace_format!r} (opciones: {', '.join(TRACE_FORMATS)})")
+        data = self.to_chrome_trace() if trace_format == "chrome" else self.to_json()
+        write_json(path, data, make_dirs=bool(os.path.dirname(path)))
+
+
+def span(name, category="stage", **args):
+    """
+    Abre un span en el Tracer activo (o un contexto vacío si no hay trazas).
+    """
+    tracer = _active
+    if tracer is None:
+        return _NULL_SPAN
+    return Span(tracer, name, category, args)
+
+
+def count(name, value=1):
+    """
+    Suma value al contador name del Tracer activo, si lo hay.
+    """
+    tracer = _active
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def add(name, value=1):
+    """
+    Como count(), pero también suma value al span abierto más interno del hilo actual.
+    """
+    tracer = _active
+    if tracer is not None:
+        tracer.add(name, value)
+
+
+@contextmanager
+def tracing(enabled=True):
+    """
+    Activa un Tracer nuevo durante el bloque y lo devuelve (None si enabled es False).
+    """
+    global _active
+    if not enabled:
+        yield None
+        return
+    previous = _active
+    tracer = _active = Tracer()
+    try:
+        yield tracer
+    finally:
+        _active = previous
+
+
+def merge_summaries(summaries):
+    """
+    Suma los resúmenes (Tracer.summary) de varias ejecuciones, p. ej. las de un batch.
+    Los dashboards de distintos workbooks con el mismo nombre se suman juntos.
+    """
+    merged = {"stages": {}, "counters": {}, "dashboards": {}}
+    for summary in summaries:
+        for name, stage in summary.get("stages", {}).items():
+            total = merged["stages"].setdefault(name, {"count": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            total["count"] += stage["count"]
+            total["wall_s"] = round(total["wall_s"] + stage["wall_s"], 6)
+            total["cpu_s"] = round(total["cpu_s"] + stage["cpu_s"], 6)
+        for name, value in summary.get("counters", {}).items():
+            merged["counters"][name] = merged["counters"].get(name, 0) + value
+        for name, dashboard in summary.get("dashboards", {}).items():
+            total = merged["dashboards"].setdefault(name, {"files_written": 0, "bytes_written": 0})
+            total["files_written"] += dashboard["files_written"]
+            total["bytes_written"] += dashboard["bytes_written"]
+    return merged
@@ -1,4 +1,7 @@
 import random
+import hashlib
+
+from records import FieldRecord
 
 def generar_hex_metodo():
     """
@@ -8,6 +11,36 @@ def generar_hex_metodo():
     return ''.join(random.choice(digitos_hex) for _ in range(20))
 
 
+def stable_id(*parts):
+    """
+    Genera un identificador hexadecimal de 20 caracteres derivado de forma estable de parts
+    (workbook, dashboard, worksheet, campo...). Las mismas entradas producen siempre el mismo ID,
+    y el formato es válido como nombre de página, visual o filtro de Power BI.
+    """
+    key = "\x1f".join(str(part) for part in parts)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+
+class IdRegistry:
+    """
+    Emite IDs deterministas (ver stable_id) garantizando que no se repitan dentro de un reporte.
+    Si un ID ya fue emitido (entradas repetidas o colisión del hash), se deriva uno nuevo
+    agregando un contador, por lo que el resultado depende solo de las entradas y su orden.
+    """
+
+    def __init__(self):
+        self._issued = set()
+
+    def new_id(self, *parts):
+        candidate = stable_id(*parts)
+        counter = 1
+        while candidate in self._issued:
+            candidate = stable_id(*parts, counter)
+            counter += 1
+        self._issued.add(candidate)
+        return candidate
+
+
 def normalize_name(name):
     """
     Normaliza un nombre: elimina espacios al inicio/fin y lo convierte a minúsculas.
@@ -15,12 +48,56 @@ def normalize_name(name):
     """
     return name.strip().lower() if name else ""
 
-def scale_zone(zone, max_width, max_height, target_width=1280, target_height=720):
-    scale_x = target_width / max_width if max_width else 1
-    scale_y = target_height / max_height if max_height else 1
-    return {
-        "x": int(zone["x"] * scale_x),
-        "y": int(zone["y"] * scale_y),
-        "width": int(zone["width"] * scale_x),
-        "height": int(zone["height"] * scale_y)
-    }
+def normalize_field(field):
+    """
+    Normaliza el nombre de un campo de Tableau para compararlo: sin corchetes y en minúsculas.
+    """
+    return field.replace('[', '').replace(']', '').lower()
+
+def build_field_index(dependency_info, datatypes=None):
+    """
+    Construye el índice de campos de un worksheet: nombre o caption normalizado -> FieldRecord
+    (name, caption, role, datatype, derivation). Si un nombre aparece en más de una columna se
+    conserva la primera, igual que el recorrido lineal de dependency_info.
+    datatypes ({nombre de columna: datatype}) completa el tipo de dato si las columnas no lo traen.
+    """
+    index = {}
+    for dependency in dependency_info:
+        derivations = {}
+        for column_instance in dependency.get("column_instances", []):
+            derivations.setdefault(column_instance.get("column", ""), column_instance.get("derivation", ""))
+        for column in dependency.get("columns", []):
+            name = column.get("name", "")
+            caption = column.get("caption", "")
+            field = FieldRecord(
+                name=name,
+                caption=caption,
+                role=column.get("role", ""),
+                datatype=column.get("datatype") or (datatypes or {}).get(name, ""),
+                derivation=derivations.get(name, "")
+            )
+            index.setdefault(normalize_field(name), field)
+            caption_norm = normalize_field(caption)
+            if caption_norm:
+                index.setdefault(caption_norm, field)
+    return index
+
+def field_index_for(worksheet):
+    """
+    Devuelve el índice de campos de un worksheet: el que se armó en la extracción
+    (WorksheetRecord.field_index) o, para diccionarios planos, uno construido en el momento.
+    """
+    index = getattr(worksheet, "field_index", None)
+    if index is None:
+        index = build_field_index(worksheet.get("dependency_info", []))
+    return index
+
+def index_worksheets_by_name(extracted_data):
+    """
+    Construye un diccionario nombre normalizado -> worksheet_data.
+    Si hay nombres repetidos se conserva el primero, igual que una búsqueda lineal.
+    """
+    index = {}
+    for worksheet_data in extracted_data:
+        index.setdefault(normalize_name(worksheet_data["worksheet"]["worksheet_name"]), worksheet_data)
+    return index
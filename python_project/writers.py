@@ -0,0 +1,190 @@
+import os
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from serialization import write_json
+from report_tree import ReportTree
+import tracing
+
+"""
+Escritura de los archivos JSON del reporte Power BI.
+InlineWriter ejecuta cada tarea en el momento; PipelinedWriter las ejecuta en un pool
+de hilos con una cola acotada, para solapar la latencia de escritura (p. ej. en unidades
+de red o sincronizadas con OneDrive) con la generación de los visuals.
+Cada escritura crea la carpeta de su archivo, así que no hace falta llamar a makedirs antes de
+write_json/store_json; makedirs solo se usa para carpetas que pueden quedar vacías.
+TreeWriter y ArchiveWriter arman el reporte en memoria (ReportTree) en lugar de escribir carpetas.
+"""
+
+
+def write_json_file(path, data, serializer=None):
+    """
+    Escribe data como JSON en path, creando la carpeta si no existe. Devuelve los bytes escritos.
+    """
+    size = write_json(path, data, serializer, make_dirs=True)
+    tracing.add("files_written")
+    tracing.add("bytes_written", size)
+    return size
+
+
+class InlineWriter:
+    """
+    Ejecuta las tareas de forma secuencial en el hilo que las envía.
+    """
+
+    def __init__(self, serializer=None):
+        self.serializer = serializer
+
+    def submit(self, fn, *args, **kwargs):
+        fn(*args, **kwargs)
+
+    def makedirs(self, path):
+        os.makedirs(path, exist_ok=True)
+
+    def store_json(self, path, data):
+        """
+        Escribe data en path desde el hilo actual.
+        """
+        write_json_file(path, data, self.serializer)
+
+    def write_json(self, path, data):
+        self.submit(self.store_json, path, data)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PipelinedWriter:
+    """
+    Ejecuta tareas de generación/escritura en un ThreadPoolExecutor.
+    Como máximo max_pending tareas quedan en vuelo: submit() se bloquea cuando la cola
+    está llena, así la memoria de los visuals pendientes queda acotada.
+    close() espera a que terminen todas y relanza el primer error encontrado.
+    """
+
+    def __init__(self, max_workers=8, max_pending=64, serializer=None):
+        self.serializer = serializer
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._error = None
+
+    def submit(self, fn, *args, **kwargs):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+
+    def makedirs(self, path):
+        """
+        Crea la carpeta en el pool, sin bloquear el hilo que genera las páginas.
+        """
+        self.submit(os.makedirs, path, exist_ok=True)
+
+    def store_json(self, path, data):
+        """
+        Escribe data en path desde el hilo actual (usado por las tareas del pool).
+        """
+        write_json_file(path, data, self.serializer)
+
+    def write_json(self, path, data):
+        self.submit(self.store_json, path, data)
+
+    def _on_done(self, future):
+        error = future.exception()
+        if error is not None:
+            with self._lock:
+                if self._error is None:
+                    self._error = error
+        self._slots.release()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class TreeWriter:
+    """
+    Guarda los archivos en un ReportTree en memoria, sin tocar el disco.
+    Las rutas que recibe se interpretan relativas a root, que no se crea en disco.
+    Cada archivo se guarda como una copia profunda: los visuals reutilizados entre dashboards
+    (generators.VisualCache) comparten subárboles, y así modificar un nodo del árbol no
+    cambia los visuals de otras páginas.
+    """
+
+    def __init__(self, tree, root):
+        self.tree = tree
+        self.root = root
+        self.serializer = tree.serializer
+        self._lock = threading.Lock()
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.root)
+
+    def submit(self, fn, *args, **kwargs):
+        fn(*args, **kwargs)
+
+    def makedirs(self, path):
+        with self._lock:
+            self.tree.add_folder(self._relative(path))
+
+    def store_json(self, path, data):
+        data = copy.deepcopy(data)
+        relative = self._relative(path)
+        folder = os.path.dirname(relative)
+        with self._lock:
+            if folder:
+                self.tree.add_folder(folder)
+            self.tree.add(relative, data)
+
+    def write_json(self, path, data):
+        self.store_json(path, data)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ArchiveWriter(TreeWriter):
+    """
+    Arma el árbol definition/ completo en memoria y lo escribe en un único archivo zip
+    con una sola escritura secuencial al cerrar (ver archive.py).
+    """
+
+    def __init__(self, archive_path, root, serializer=None):
+        super().__init__(ReportTree(serializer), root)
+        self.archive_path = archive_path
+
+    def close(self):
+        with tracing.span("write_archive", "write", files=len(self.tree)) as archive_span:
+            size = self.tree.write_archive(self.archive_path)
+            archive_span.set(bytes=size)
+        tracing.add("files_written")
+        tracing.add("bytes_written", size)
+
+    def __exit__(self, exc_type, exc, tb):
+        # Si la conversión falló no se deja un archivo a medias
+        if exc_type is None:
+            self.close()
@@ -0,0 +1,158 @@
+import os
+import re
+import mmap
+import xml.etree.ElementTree as ET
+from contextlib import closing
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+from mapped_input import iter_chunks
+
+"""
+Backend de parseo XML de los workbooks.
+Si lxml está instalado se usa lxml (parser en C y consultas preparadas una sola vez al
+importar este módulo); si no, xml.etree.ElementTree de la librería estándar.
+Las consultas se declaran como Query(".//zone") y se aplican a elementos de cualquiera de
+los dos backends con los mismos resultados (mismo orden de documento).
+
+El backend se elige con la variable de entorno TABLEAU_XML_BACKEND ("auto", "lxml", "etree")
+o con set_backend() (p. ej. el benchmark, para comparar ambos).
+"""
+
+BACKENDS = ("auto", "lxml", "etree")
+
+# Errores de XML inválido de cualquiera de los dos backends
+if lxml_etree is not None:
+    ParseError = (ET.ParseError, lxml_etree.XMLSyntaxError)
+else:
+    ParseError = (ET.ParseError,)
+
+_backend = None
+
+# ".//tag" (descendientes) o "tag" (hijos directos)
+_SIMPLE_PATH = re.compile(r"^(\.//)?([A-Za-z_][\w.-]*)$")
+
+
+def set_backend(name="auto"):
+    """
+    Elige el backend de parseo ("auto" usa lxml si está instalado). Devuelve el backend activo.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Backend XML desconocido: {name!r} (opciones: {', '.join(BACKENDS)})")
+    if name == "lxml" and lxml_etree is None:
+        raise ValueError("El backend 'lxml' no está instalado")
+    _backend = "lxml" if name == "auto" and lxml_etree is not None else name
+    if _backend == "auto":
+        _backend = "etree"
+    return _backend
+
+
+def get_backend():
+    return _backend
+
+
+def available_backends():
+    """
+    Backends que se pueden usar en este entorno.
+    """
+    return ("lxml", "etree") if lxml_etree is not None else ("etree",)
+
+
+def _lxml_parser():
+    # huge_tree: workbooks con miles de worksheets; sin resolver entidades externas
+    return lxml_etree.XMLParser(huge_tree=True, resolve_entities=False, no_network=True)
+
+
+def parse(source):
+    """
+    Parsea un archivo (ruta, archivo binario o mmap) y devuelve el elemento raíz.
+    Un mmap se entrega al parser por bloques, sin copiarlo entero a bytes (ver mapped_input.py).
+    """
+    if isinstance(source, mmap.mmap):
+        return _parse_buffer(source)
+    if _backend == "lxml":
+        return lxml_etree.parse(source, _lxml_parser()).getroot()
+    return ET.parse(source).getroot()
+
+
+def _parse_buffer(mapped):
+    lxml = _backend == "lxml"
+    parser = _lxml_parser() if lxml else ET.XMLParser()
+    # closing: libera los bloques aunque el XML sea inválido, para poder cerrar el mapa
+    with closing(iter_chunks(mapped)) as chunks:
+        for chunk in chunks:
+            # feed() de lxml solo acepta bytes (fromstring() tampoco acepta buffers antes de
+            # lxml 6): se copia de a un bloque, nunca el archivo entero
+            parser.feed(bytes(chunk) if lxml else chunk)
+    return parser.close()
+
+
+def iterparse(source, events=("start", "end")):
+    """
+    Recorre el documento en modo streaming; devuelve pares (evento, elemento).
+    """
+    if _backend == "lxml":
+        return lxml_etree.iterparse(source, events=events, huge_tree=True, resolve_entities=False, no_network=True)
+    return ET.iterparse(source, events=events)
+
+
+def tostring(element):
+    """
+    Serializa un elemento a bytes UTF-8 (para huellas de contenido).
+    """
+    if isinstance(element, ET.Element):
+        return ET.tostring(element, encoding="utf-8")
+    return lxml_etree.tostring(element, encoding="utf-8")
+
+
+class Query:
+    """
+    Consulta de elementos en sintaxis de ruta ElementTree (".//zone", "connection",
+    ".//relation//relation"), que también es XPath válido.
+    Con lxml, las rutas de un solo paso (hijos o descendientes con un tag) usan los iteradores
+    en C de lxml, y el resto se compila una vez con etree.XPath.
+    """
+    __slots__ = ("path", "_tag", "_descendant", "_all", "_first")
+
+    def __init__(self, path):
+        self.path = path
+        self._tag = self._all = self._first = None
+        self._descendant = False
+        if lxml_etree is None:
+            return
+        match = _SIMPLE_PATH.match(path)
+        if match:
+            self._descendant = bool(match.group(1))
+            self._tag = match.group(2)
+        else:
+            self._all = lxml_etree.XPath(path)
+            self._first = lxml_etree.XPath(f"({path})[1]")
+
+    def findall(self, element):
+        if lxml_etree is None or isinstance(element, ET.Element):
+            return element.findall(self.path)
+        if self._tag is not None:
+            if self._descendant:
+                return list(element.iterdescendants(self._tag))
+            return list(element.iterchildren(self._tag))
+        return self._all(element)
+
+    def find(self, element):
+        if lxml_etree is None or isinstance(element, ET.Element):
+            return element.find(self.path)
+        if self._tag is not None:
+            if self._descendant:
+                return next(element.iterdescendants(self._tag), None)
+            return next(element.iterchildren(self._tag), None)
+        result = self._first(element)
+        return result[0] if result else None
+
+    def __repr__(self):
+        return f"Query({self.path!r})"
+
+
+set_backend(os.environ.get("TABLEAU_XML_BACKEND", "auto"))